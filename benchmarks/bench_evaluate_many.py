@@ -0,0 +1,61 @@
+"""
+Throughput of evaluate_many() against the mock GitHub API with simulated network latency, compared
+with evaluating the same pull requests one after another.
+
+Usage: python -m benchmarks.bench_evaluate_many [--pull-requests N] [--latency SECONDS] [--workers N]
+"""
+import argparse
+import time
+
+import mock
+
+from lgtm import evaluate_many
+from lgtm import pull_request_ready_to_merge
+from lgtm.tests import mock_github
+
+
+def setup_pull_requests(count):
+    mock_github.create_fake_org()
+    mock_github.create_fake_repo()
+    mock_github.create_fake_pull_request(id=1)
+    for pr_number in range(2, count + 1):
+        mock_github.add_fake_pull_request(id=pr_number)
+    return [('OrgName', 'repo-name', pr_number) for pr_number in range(1, count + 1)]
+
+
+def run(pull_request_count, latency, workers):
+    pull_requests = setup_pull_requests(pull_request_count)
+    with mock.patch('lgtm.git.PyGithub', mock_github.MockPyGithub):
+        mock_github.set_latency(latency)
+        start = time.time()
+        for org, repo, pr_number in pull_requests:
+            pull_request_ready_to_merge('token', org, repo, pr_number)
+        serial_seconds = time.time() - start
+
+        start = time.time()
+        results = list(evaluate_many('token', pull_requests, max_workers=workers))
+        concurrent_seconds = time.time() - start
+        mock_github.set_latency(0)
+    assert not any(result.error for result in results)
+    return {
+        'pull_requests': pull_request_count,
+        'latency': latency,
+        'workers': workers,
+        'serial_per_second': pull_request_count / serial_seconds,
+        'concurrent_per_second': pull_request_count / concurrent_seconds,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pull-requests', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=8)
+    options = parser.parse_args(args)
+    result = run(options.pull_requests, options.latency, options.workers)
+    print('%(pull_requests)d PRs, %(latency).3fs latency: serial %(serial_per_second).1f PR/s, '
+          '%(workers)d workers %(concurrent_per_second).1f PR/s' % result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Latency of GitHub.expand_teams() for a pull request that needs many teams, against the mock GitHub
+API with simulated network latency, looking the teams up one at a time and with a thread pool.
+
+Usage: python -m benchmarks.bench_expand_teams [--teams N] [--latency SECONDS] [--workers N]
+"""
+import argparse
+import time
+
+import mock
+
+from lgtm import git
+from lgtm.tests import mock_github
+
+
+def run(team_count, latency, workers):
+    mock_github.create_fake_org(teams=[
+        mock_github.MockTeam('team%d' % i, ['user%d' % j for j in range(i, i + 10)]) for i in range(team_count)])
+    team_names = ['OrgName/team%d' % i for i in range(team_count)]
+    timings = {}
+    with mock.patch('lgtm.git.PyGithub', mock_github.MockPyGithub):
+        mock_github.set_latency(latency)
+        for name, team_workers in (('serial', 1), ('parallel', workers)):
+            git_hub = git.GitHub('token', 'OrgName', 'repo-name', team_workers=team_workers)
+            start = time.time()
+            timings[name] = (git_hub.expand_teams(team_names), time.time() - start)
+        mock_github.set_latency(0)
+    assert timings['serial'][0] == timings['parallel'][0], 'expand_teams() order differs with a thread pool'
+    return {
+        'teams': team_count,
+        'latency': latency,
+        'workers': workers,
+        'serial_seconds': timings['serial'][1],
+        'parallel_seconds': timings['parallel'][1],
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=24)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=git.DEFAULT_TEAM_WORKERS)
+    options = parser.parse_args(args)
+    result = run(options.teams, options.latency, options.workers)
+    print('%(teams)d teams, %(latency).3fs latency: serial %(serial_seconds).3fs, '
+          '%(workers)d workers %(parallel_seconds).3fs' % result)
+
+
+if __name__ == '__main__':
+    main()
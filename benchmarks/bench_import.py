@@ -0,0 +1,58 @@
+"""
+Startup cost of the lgtm command line tool. Times `lgtm --version` in fresh interpreters, and lists
+the heavy modules it loaded.
+
+Usage: python -m benchmarks.bench_import [--runs N] [--max-seconds SECONDS]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+
+# modules that only evaluating a pull request needs
+HEAVY_MODULES = ('github', 'dateutil', 'pkg_resources', 'sqlite3', 'httplib', 'http.client', 'ssl')
+
+VERSION_COMMAND = 'from lgtm import console; console.main(["--version"])'
+
+
+def get_heavy_modules(command=VERSION_COMMAND):
+    """
+    :param command: Python code to run in a fresh interpreter
+    :return: the HEAVY_MODULES that it imported
+    """
+    script = '%s\nimport sys\nprint("heavy:" + ",".join(m for m in %r if m in sys.modules))' % (
+        command, HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', script], stderr=subprocess.STDOUT)
+    for line in output.decode('utf-8').splitlines():
+        if line.startswith('heavy:'):
+            return [module for module in line[len('heavy:'):].split(',') if module]
+    return []
+
+
+def time_startup(runs):
+    timings = []
+    for _ in range(runs):
+        start = time.time()
+        subprocess.check_output([sys.executable, '-c', VERSION_COMMAND], stderr=subprocess.STDOUT)
+        timings.append(time.time() - start)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='Exit with an error if the median startup time is slower')
+    options = parser.parse_args(args)
+    median = time_startup(options.runs)
+    heavy_modules = get_heavy_modules()
+    print('lgtm --version: median %.3fs over %d runs, heavy modules: %s' % (
+        median, options.runs, ', '.join(heavy_modules) or 'none'))
+    if heavy_modules or (options.max_seconds and median > options.max_seconds):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
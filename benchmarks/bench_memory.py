@@ -0,0 +1,104 @@
+"""
+Memory kept per evaluated pull request by its comment snapshot, keeping every comment as fetched
+and keeping them as compact records, whose bodies are let go once they have been scanned and
+found not to sign off. Bots post long coverage reports and build logs, like in bench_signoff.
+
+Uses tracemalloc where it is available (Python 3), and otherwise adds up sys.getsizeof() of every
+object reachable from the snapshots.
+
+Usage: python -m benchmarks.bench_memory [--pull-requests N] [--comments N] [--bot-body-bytes N]
+"""
+import argparse
+import gc
+import sys
+import types
+
+from benchmarks.bench_signoff import generate_comments
+from lgtm import git
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+# shared by every object, not kept for a pull request
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def deep_size(root):
+    seen = set()
+    pending = [root]
+    size = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return size
+
+
+def measure(build):
+    """
+    :param build: a function that returns the objects to keep
+    :return: (the objects, the bytes they keep)
+    """
+    if tracemalloc is None:
+        kept = build()
+        return kept, deep_size(kept)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        gc.collect()
+        return kept, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def run(pull_request_count, comment_count, bot_body_bytes):
+    detector = git.SignOffDetector()
+    results = {}
+    for name, compact in (('fetched', False), ('compact', True)):
+        def build():
+            # the comments are fetched again for every pull request, and dropped once the snapshot is built
+            snapshots = []
+            for i in range(pull_request_count):
+                snapshot = git.CommentSnapshot(generate_comments(comment_count, 20, bot_body_bytes, seed=i),
+                                               compact=compact)
+                # an evaluation with every comment after the last commit
+                detector.signed_off_by(snapshot.comments)
+                snapshots.append(snapshot)
+            return snapshots
+        snapshots, size = measure(build)
+        results[name] = (snapshots, size)
+    fetched, compact = results['fetched'][0], results['compact'][0]
+    for before, after in zip(fetched, compact):
+        assert detector.signed_off_by(before.comments) == detector.signed_off_by(after.comments), \
+            'the compact snapshot lost a sign-off'
+    return {
+        'pull_requests': pull_request_count,
+        'comments': comment_count,
+        'bot_body_bytes': bot_body_bytes,
+        'method': 'tracemalloc' if tracemalloc else 'getsizeof',
+        'fetched_bytes_per_pr': results['fetched'][1] // pull_request_count,
+        'compact_bytes_per_pr': results['compact'][1] // pull_request_count,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pull-requests', type=int, default=20)
+    parser.add_argument('--comments', type=int, default=200)
+    parser.add_argument('--bot-body-bytes', type=int, default=20000)
+    options = parser.parse_args(args)
+    result = run(options.pull_requests, options.comments, options.bot_body_bytes)
+    print('%(comments)d comments, %(bot_body_bytes)d byte bot comments, per pull request (%(method)s): '
+          'fetched %(fetched_bytes_per_pr)d bytes, compact %(compact_bytes_per_pr)d bytes' % result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare the compiled OWNERS matcher with the original one-fnmatch.filter()-per-rule loop.
+
+Usage: python -m benchmarks.bench_owners [--rules N] [--files N]
+"""
+import argparse
+import fnmatch
+import random
+import timeit
+
+from lgtm import owners
+from lgtm import utils
+
+
+def fnmatch_owners_of_files(owner_glob_tuple_list, files):
+    # the original get_owners_of_files() implementation, kept as the baseline
+    reviewers, required = list(), list()
+    for owner, glob in owner_glob_tuple_list:
+        if glob:
+            if fnmatch.filter(files, glob):
+                reviewers.append(owner)
+                required.append(owner)
+        else:
+            reviewers.append(owner)
+    return utils.ordered_set(reviewers), utils.ordered_set(required)
+
+
+def generate_rules(count, seed=0):
+    rng = random.Random(seed)
+    rules = [('catch-all', None)]
+    for i in range(count):
+        kind = rng.randint(0, 3)
+        if kind == 0:
+            glob = 'services/svc%d/*' % i
+        elif kind == 1:
+            glob = '*.ext%d' % i
+        elif kind == 2:
+            glob = '*/component%d/*' % i
+        else:
+            glob = 'lib/pkg%d/*.py' % i
+        rules.append(('owner%d' % i, glob))
+    return rules
+
+
+def generate_files(count, rule_count, seed=1):
+    rng = random.Random(seed)
+    files = []
+    for i in range(count):
+        n = rng.randint(0, rule_count * 2)
+        kind = rng.randint(0, 3)
+        if kind == 0:
+            files.append('services/svc%d/handler%d.go' % (n, i))
+        elif kind == 1:
+            files.append('assets/file%d.ext%d' % (i, n))
+        elif kind == 2:
+            files.append('app/component%d/view%d.js' % (n, i))
+        else:
+            files.append('lib/pkg%d/module%d.py' % (n, i))
+    return files
+
+
+def run(rule_count, file_count, repeat=3):
+    rules = generate_rules(rule_count)
+    files = generate_files(file_count, rule_count)
+    expected = fnmatch_owners_of_files(rules, files)
+    actual = owners.compile_matcher(rules).get_owners_of_files(files)
+    assert actual == expected, 'compiled matcher disagrees with fnmatch'
+    return {
+        'rules': rule_count,
+        'files': file_count,
+        'fnmatch_seconds': min(timeit.repeat(
+            lambda: fnmatch_owners_of_files(rules, files), number=1, repeat=repeat)),
+        'compiled_seconds': min(timeit.repeat(
+            lambda: owners.compile_matcher(rules).get_owners_of_files(files), number=1, repeat=repeat)),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rules', type=int, default=2000)
+    parser.add_argument('--files', type=int, default=5000)
+    options = parser.parse_args(args)
+    result = run(options.rules, options.files)
+    print('%(rules)d rules x %(files)d files: fnmatch %(fnmatch_seconds).3fs, '
+          'compiled %(compiled_seconds).3fs' % result)
+
+
+if __name__ == '__main__':
+    main()
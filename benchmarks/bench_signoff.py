@@ -0,0 +1,82 @@
+"""
+Compare git.SignOffDetector with the original loop that ran the alias regex on every comment, over
+a synthetic comment corpus where bots post long coverage reports and build logs.
+
+Usage: python -m benchmarks.bench_signoff [--comments N] [--reviewers N] [--bot-body-bytes N]
+"""
+import argparse
+import collections
+import datetime
+import random
+import timeit
+
+from lgtm import git
+from lgtm import utils
+
+
+_User = collections.namedtuple('_User', ['login'])
+_Comment = collections.namedtuple('_Comment', ['id', 'user', 'created_at', 'body'])
+
+
+def regex_signed_off_by(comments, since, except_login):
+    # the original signed_off_by() loop, kept as the baseline
+    lgtm_logins = []
+    for comment in comments:
+        if since and comment.created_at < since:
+            continue
+        if git.LGTM_ALIAS_RE.search(comment.body):
+            lgtm_logins.append(comment.user.login)
+    return utils.ordered_set(login for login in lgtm_logins if login != except_login)
+
+
+def generate_comments(count, reviewer_count, bot_body_bytes, seed=0):
+    rng = random.Random(seed)
+    start = datetime.datetime(2016, 1, 1)
+    report_line = 'src/module%d.py    120    4    97%%    12-15\n'
+    log_line = '[2016-01-01 00:00:00] INFO running test_case_%d ... ok\n'
+    comments = []
+    for i in range(count):
+        created_at = start + datetime.timedelta(seconds=i)
+        kind = rng.randint(0, 9)
+        if kind < 4:
+            line = report_line if kind % 2 else log_line
+            body = ''.join(line % n for n in range(bot_body_bytes // len(line)))
+            comments.append(_Comment(i, _User('ci-bot'), created_at, body))
+        else:
+            login = 'reviewer%d' % rng.randint(0, reviewer_count - 1)
+            body = 'LGTM :shipit:' if kind == 9 else 'Comment %d, could this loop be simpler?' % i
+            comments.append(_Comment(i, _User(login), created_at, body))
+    return comments
+
+
+def run(comment_count, reviewer_count, bot_body_bytes, repeat=3):
+    comments = generate_comments(comment_count, reviewer_count, bot_body_bytes)
+    since = comments[len(comments) // 10].created_at
+    detector = git.SignOffDetector()
+    expected = regex_signed_off_by(comments, since, 'author')
+    assert detector.signed_off_by(comments, since=since, except_login='author') == expected, \
+        'SignOffDetector disagrees with the regex loop'
+    return {
+        'comments': comment_count,
+        'reviewers': reviewer_count,
+        'bot_body_bytes': bot_body_bytes,
+        'regex_seconds': min(timeit.repeat(
+            lambda: regex_signed_off_by(comments, since, 'author'), number=1, repeat=repeat)),
+        'detector_seconds': min(timeit.repeat(
+            lambda: detector.signed_off_by(comments, since=since, except_login='author'), number=1, repeat=repeat)),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--comments', type=int, default=2000)
+    parser.add_argument('--reviewers', type=int, default=20)
+    parser.add_argument('--bot-body-bytes', type=int, default=50000)
+    options = parser.parse_args(args)
+    result = run(options.comments, options.reviewers, options.bot_body_bytes)
+    print('%(comments)d comments, %(bot_body_bytes)d byte bot comments: regex %(regex_seconds).3fs, '
+          'detector %(detector_seconds).3fs' % result)
+
+
+if __name__ == '__main__':
+    main()
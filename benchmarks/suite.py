@@ -0,0 +1,174 @@
+"""
+Benchmark suite over synthetic workloads served by the mock GitHub API: large OWNERS files, huge
+file lists, thousands of comments and large nested teams. Times owners.parse(),
+get_owners_of_files(), signed_off_by(), expand_teams() and pull_request_ready_to_merge(), counts
+the mock API calls each one makes, and writes the results as JSON. With --baseline, exits with an
+error when a benchmark got slower than --threshold times the baseline, or makes more API calls.
+
+Usage: python -m benchmarks.suite [--scale N] [--repeat N] [--output FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import mock
+
+from benchmarks.bench_owners import generate_files
+from benchmarks.bench_owners import generate_rules
+from lgtm import git
+from lgtm import owners
+from lgtm import pull_request_ready_to_merge
+from lgtm.tests import mock_github
+
+
+def generate_owners_lines(rule_count, team_count):
+    lines = ['@OrgName/team%d' % i for i in range(team_count)]
+    for owner, glob in generate_rules(rule_count):
+        lines.append('@%s %s' % (owner, glob) if glob else '@%s' % owner)
+    return lines
+
+
+def generate_comments(count, reviewers):
+    comments = []
+    for i in range(count):
+        login = reviewers[i % len(reviewers)]
+        body = 'lgtm' if i % 10 == 0 else 'Comment %d about line %d, could this be simpler?' % (i, i * 7)
+        comments.append(('2016-01-02 %02d:%02d:%02d' % (i // 3600 % 24, i // 60 % 60, i % 60), login, body))
+    return comments
+
+
+def generate_teams(count, members_per_team, depth):
+    """
+    Teams nested depth levels deep. Like GitHub, a team's member list includes its child teams.
+    """
+    teams = []
+    for i in range(count):
+        logins = ['user%d' % (i * members_per_team + j) for j in range(members_per_team)]
+        for level in range(1, depth):
+            child = i + level * count
+            logins.extend('user%d' % (child * members_per_team + j) for j in range(members_per_team))
+        teams.append(mock_github.MockTeam('team%d' % i, logins))
+    return teams
+
+
+class Workload(object):
+
+    def __init__(self, scale):
+        self.rule_count = 500 * scale
+        self.file_count = 3000 * scale
+        self.comment_count = 1000 * scale
+        self.team_count = 20 * scale
+        self.members_per_team = 25
+        self.team_depth = 4
+        self.owners_lines = generate_owners_lines(self.rule_count, self.team_count)
+        self.rules = owners.parse(self.owners_lines)
+        self.files = generate_files(self.file_count, self.rule_count)
+        self.teams = generate_teams(self.team_count, self.members_per_team, self.team_depth)
+        self.team_names = ['OrgName/team%d' % i for i in range(self.team_count)]
+        self.comments = generate_comments(self.comment_count, ['user%d' % i for i in range(50)])
+
+    def install(self):
+        mock_github.create_fake_org(teams=self.teams)
+        mock_github.create_fake_repo(file_contents={'OWNERS': '\n'.join(self.owners_lines)})
+        mock_github.create_fake_pull_request(
+            id=1, author='user0', last_commit_date='2016-01-01 00:00:00', file_paths=self.files,
+            comments=self.comments)
+
+    def describe(self):
+        return {
+            'rules': self.rule_count,
+            'files': self.file_count,
+            'comments': self.comment_count,
+            'teams': self.team_count,
+            'members_per_team': self.members_per_team,
+            'team_depth': self.team_depth,
+        }
+
+
+def measure(name, func, repeat):
+    """
+    :return: a result dict with the best time of repeat runs, and the mock API calls of one run
+    """
+    mock_github.reset_api_calls()
+    func()
+    api_calls = len(mock_github.get_api_calls())
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    return {'name': name, 'seconds': seconds, 'api_calls': api_calls}
+
+
+def run(scale=1, repeat=3):
+    workload = Workload(scale)
+    workload.install()
+    results = []
+    with mock.patch('lgtm.git.PyGithub', mock_github.MockPyGithub):
+        results.append(measure('owners.parse', lambda: owners.parse(workload.owners_lines), repeat))
+        results.append(measure(
+            'get_owners_of_files', lambda: owners.get_owners_of_files(workload.rules, workload.files), repeat))
+        results.append(measure(
+            'signed_off_by', lambda: git.GitHub('token', 'OrgName', 'repo-name').get_pull_request(1).signed_off_by(),
+            repeat))
+        results.append(measure(
+            'expand_teams', lambda: git.GitHub('token', 'OrgName', 'repo-name').expand_teams(workload.team_names),
+            repeat))
+        results.append(measure(
+            'pull_request_ready_to_merge',
+            lambda: pull_request_ready_to_merge('token', 'OrgName', 'repo-name', 1), repeat))
+    return {
+        'python': platform.python_version(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'scale': scale,
+        'workload': workload.describe(),
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """
+    :return: a list of messages, one per benchmark that regressed against the baseline report
+    """
+    baseline_results = dict((result['name'], result) for result in baseline['results'])
+    regressions = []
+    for result in report['results']:
+        before = baseline_results.get(result['name'])
+        if not before:
+            continue
+        if result['seconds'] > before['seconds'] * threshold:
+            regressions.append('%s: %.4fs, was %.4fs' % (result['name'], result['seconds'], before['seconds']))
+        if result['api_calls'] > before['api_calls']:
+            regressions.append('%s: %d API calls, was %d' % (result['name'], result['api_calls'], before['api_calls']))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=1, help='Multiplies the size of every workload')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='How many times slower than the baseline counts as a regression')
+    options = parser.parse_args(args)
+    report = run(options.scale, options.repeat)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(output + '\n')
+        for result in report['results']:
+            print('%(name)-28s %(seconds)8.4fs %(api_calls)6d API calls' % result)
+    else:
+        print(output)
+    if options.baseline:
+        with open(options.baseline) as f:
+            regressions = compare(report, json.load(f), options.threshold)
+        for regression in regressions:
+            sys.stderr.write('Regression in %s\n' % regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,114 @@
-import git
-import owners
+import collections
+import logging
+import os
+import threading
+
 import integrations
+import local
+import pool
+import results
+import stats
 
 from utils import generate_comment
 
 
-def pull_request_ready_to_merge(github_token, org, repo, pr_number, owners_file='OWNERS', options=None):
+__version__ = '0.0.14'
+
+logger = logging.getLogger(__name__)
+
+
+def get_github(github_token, org, repo, options=None, team_resolver=None):
     """
-    Using the GitHub API, check whether a pull request is ready to be merged. Adds a comment to the
-    pull request that tags anyone who owns a file in the diff.
+    Create the git.GitHub helper used to evaluate pull requests in one repository.
     :param github_token: A GitHub API token, used to read information and add a comment.
     :param org: A string name of the GitHub organization that owns the repository.
-    :param repo: A string name of the GitHub repository for this pull request.
-    :param pr_number: An integer ID for the GitHub pull request.
-    :param owners_file: A relative path inside the repository where the OWNERS file is defined.
-    :param options: Dict of options to be used
+    :param repo: A string name of the GitHub repository.
+    :param options: Dict of options to be used, see pull_request_ready_to_merge()
+    :param team_resolver: An optional git.TeamResolver shared with other helpers
+    :return: a git.GitHub object
+    """
+    # PyGithub and dateutil are slow to import, and not needed for `lgtm --version` or `--help`
+    import git
+    options = options or {}
+    return git.GitHub(github_token=github_token, org_name=org, repo_name=repo,
+                      use_graphql=options.get('use_graphql', False),
+                      graphql_url=options.get('graphql_url'),
+                      cache_dir=options.get('cache_dir'),
+                      team_cache_ttl=options.get('team_cache_ttl'),
+                      team_resolver=team_resolver,
+                      max_requests_per_second=options.get('max_requests_per_second'),
+                      incremental_comments=options.get('incremental_comments', False),
+                      team_workers=options.get('team_workers') or git.DEFAULT_TEAM_WORKERS,
+                      memoize_results=options.get('memoize_results', False),
+                      http_pool_size=options.get('http_pool_size'),
+                      http_timeout=options.get('http_timeout'),
+                      http_retries=options.get('http_retries'),
+                      gzip=options.get('gzip', False),
+                      lgtm_aliases=options.get('lgtm_aliases'),
+                      max_rate_limit_wait=options.get('max_rate_limit_wait'))
+
+
+def _get_owners_matcher(github_repo, owners_file, options):
+    if options.get('hierarchical_owners'):
+        return github_repo.get_owners_tree(file_name=os.path.basename(owners_file))
+    return github_repo.get_owners_matcher(file_path=owners_file)
+
+
+def _read_local_checkout(pull_request, owners_file, options):
+    """
+    :return: (the owners matcher, the changed files) read from the local_repo option's checkout, or
+        None to read them from GitHub. The files are those of the pull request's head commit, which
+        need not be the one checked out, like in batch and serve modes.
+    """
+    if not options.get('local_repo'):
+        return None
+    try:
+        local_checkout = local.LocalCheckout(options['local_repo'], options.get('base_ref') or pull_request.base_branch,
+                                             head_ref=pull_request.head_sha)
+        return _get_owners_matcher(local_checkout, owners_file, options), local_checkout.changed_files()
+    except local.LocalCheckoutError as e:
+        # like a shallow clone without the commit the pull request branched off
+        logger.warning('Reading OWNERS and changed files from GitHub instead of %s: %s' % (options['local_repo'], e))
+        return None
+
+
+@stats.timed('evaluate_pull_request')
+def evaluate_pull_request(github_repo, pull_request, owners_file='OWNERS', options=None, owners_matcher=None):
+    """
+    Same as pull_request_ready_to_merge(), for an existing git.GitHub helper and git.PullRequest.
+    Lets long running callers reuse connections and caches between pull requests.
+    :param owners_matcher: optional owners.OwnersMatcher of the OWNERS file, or owners.OwnersTree
+        with the hierarchical_owners option, when it has already been read for another pull
+        request in the same repository. Not used with the local_repo option.
     :return: A boolean that represents whether the pull request can be merged.
     """
     options = options or {}
-    github_repo = git.GitHub(github_token=github_token, org_name=org, repo_name=repo)
-    pull_request = github_repo.get_pull_request(pr_number=pr_number)
-    owner_lines = github_repo.read_file_lines(file_path=owners_file)
-    owner_ids_and_globs = owners.parse(owner_lines)
-    reviewers, required = owners.get_owners_of_files(owner_ids_and_globs, pull_request.files)
+    local_result = _read_local_checkout(pull_request, owners_file, options)
+    if local_result:
+        owners_matcher, files = local_result
+    else:
+        if owners_matcher is None:
+            owners_matcher = _get_owners_matcher(github_repo, owners_file, options)
+        files = pull_request.iter_files()
+    if github_repo.result_cache is None:
+        return _evaluate(github_repo, pull_request, owners_matcher, files, options)[0]
+    files = list(files)
+    ready = results.get_verdict(github_repo, results.make_key(owners_matcher, files, pull_request, options))
+    if ready is not None:
+        logger.debug('Nothing changed since pull request %s was last evaluated' % pull_request.pr_number)
+        return ready
+    ready, reviewers = _evaluate(github_repo, pull_request, owners_matcher, files, options)
+    # after the review request comment was posted, which the next run will see
+    results.set_verdict(github_repo, results.make_key(owners_matcher, files, pull_request, options), reviewers, ready)
+    return ready
+
+
+def _evaluate(github_repo, pull_request, owners_matcher, files, options):
+    """
+    :return: (whether the pull request can be merged, the reviewers and teams it depended on)
+    """
+    reviewers, required = owners_matcher.get_owners_of_files(files)
+    all_reviewers = reviewers + required
     individual_reviewers = github_repo.expand_teams(reviewers, except_login=pull_request.author)
     approval_required = pull_request.base_branch not in options.get('skip_approval_branches', [])
     # individual_reviewers.append(pull_request.get_reviewers(owners_lines=['foo *.js', ]))
@@ -38,15 +124,91 @@ def pull_request_ready_to_merge(github_token, org, repo, pr_number, owners_file=
             pull_request.create_or_update_comment(comment)
 
     if not approval_required:
-        return True
+        return True, all_reviewers
 
     if required:
-        return pull_request.all_have_signed_off(required)
-    return pull_request.one_has_signed_off(individual_reviewers)
+        return pull_request.all_have_signed_off(required), all_reviewers
+    return pull_request.one_has_signed_off(individual_reviewers), all_reviewers
+
+
+def pull_request_ready_to_merge(github_token, org, repo, pr_number, owners_file='OWNERS', options=None):
+    """
+    Using the GitHub API, check whether a pull request is ready to be merged. Adds a comment to the
+    pull request that tags anyone who owns a file in the diff.
+    :param github_token: A GitHub API token, used to read information and add a comment.
+    :param org: A string name of the GitHub organization that owns the repository.
+    :param repo: A string name of the GitHub repository for this pull request.
+    :param pr_number: An integer ID for the GitHub pull request.
+    :param owners_file: A relative path inside the repository where the OWNERS file is defined.
+    :param options: Dict of options to be used
+    :return: A boolean that represents whether the pull request can be merged.
+    """
+    options = options or {}
+    github_repo = get_github(github_token, org, repo, options=options)
+    pull_request = github_repo.get_pull_request(
+        pr_number=pr_number, accurate_commit_dates=options.get('accurate_commit_dates', False),
+        signoff_source=options.get('signoff_source', 'comments'))
+    return evaluate_pull_request(github_repo, pull_request, owners_file=owners_file, options=options)
+
+
+EvaluationResult = collections.namedtuple(
+    'EvaluationResult', ['org', 'repo', 'pr_number', 'ready', 'error'])
+
+
+def evaluate_many(github_token, pull_requests, owners_file='OWNERS', options=None,
+                  max_workers=pool.DEFAULT_MAX_WORKERS):
+    """
+    Check whether many pull requests are ready to be merged, several at a time. One git.GitHub
+    helper and one read of the OWNERS file per repository, and one team resolver, are shared by all
+    of the evaluations.
+    :param github_token: A GitHub API token, used to read information and add a comment.
+    :param pull_requests: An iterable of (org, repo, pr_number) tuples, read lazily.
+    :param owners_file: A relative path inside each repository where the OWNERS file is defined.
+    :param options: Dict of options to be used, see pull_request_ready_to_merge()
+    :param max_workers: Maximum number of pull requests evaluated at once.
+    :return: A generator of EvaluationResult tuples, in the order the evaluations finish. error is
+        the exception raised while evaluating that pull request, if any.
+    """
+    import git
+    options = options or {}
+    team_resolver = git.TeamResolver()
+    github_repos = {}
+    owners_matchers = {}
+    lock = threading.Lock()
+    # held while a repository's helper and OWNERS file are fetched, without holding up other repositories
+    repo_locks = collections.defaultdict(threading.Lock)
+
+    def evaluate(pull_request_ref):
+        org, repo, pr_number = pull_request_ref
+        with lock:
+            repo_lock = repo_locks[(org, repo)]
+        with repo_lock:
+            if (org, repo) not in github_repos:
+                github_repos[(org, repo)] = get_github(
+                    github_token, org, repo, options=options, team_resolver=team_resolver)
+            github_repo = github_repos[(org, repo)]
+            # with local_repo, each evaluation reads the OWNERS file of its own base branch
+            if (org, repo) not in owners_matchers and not options.get('local_repo'):
+                owners_matchers[(org, repo)] = _get_owners_matcher(github_repo, owners_file, options)
+            owners_matcher = owners_matchers.get((org, repo))
+        pull_request = github_repo.get_pull_request(
+            pr_number=pr_number, accurate_commit_dates=options.get('accurate_commit_dates', False),
+            signoff_source=options.get('signoff_source', 'comments'))
+        return evaluate_pull_request(github_repo, pull_request, owners_file=owners_file, options=options,
+                                     owners_matcher=owners_matcher)
+
+    for result in pool.imap_unordered(evaluate, pull_requests, max_workers=max_workers):
+        org, repo, pr_number = result.item
+        error = result.exc_info[1] if result.exc_info else None
+        yield EvaluationResult(org, repo, pr_number, result.value, error)
 
 
 __all__ = [
     'pull_request_ready_to_merge',
+    'evaluate_pull_request',
+    'evaluate_many',
+    'EvaluationResult',
+    'get_github',
     'GitHub',
     'integrations',
 ]
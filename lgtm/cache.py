@@ -0,0 +1,203 @@
+"""
+Local caches that persist between lgtm runs, stored under a --cache-dir directory.
+"""
+import cPickle as pickle
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 100
+
+
+def _connect(cache_dir, filename):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    # many CI jobs may share one cache directory, wait on each other's write locks
+    return sqlite3.connect(os.path.join(cache_dir, filename), timeout=30, check_same_thread=False)
+
+
+class CachedResponse(object):
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def etag(self):
+        return self.headers.get('etag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('last-modified')
+
+
+class ResponseCache(object):
+    """
+    HTTP responses keyed by URL, used to send conditional requests. Once the cached bodies add up
+    to more than max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = _connect(cache_dir, 'responses.sqlite')
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, size INTEGER, '
+                'accessed REAL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    @staticmethod
+    def make_key(url, headers=None):
+        """
+        :param url: the absolute URL of a GET request
+        :param headers: request headers; responses differ by credentials and media type
+        :return: a string key
+        """
+        headers = dict((k.lower(), v) for k, v in (headers or {}).items())
+        vary = '%s\n%s' % (headers.get('authorization', ''), headers.get('accept', ''))
+        return '%s %s' % (url, hashlib.sha1(vary).hexdigest())
+
+    def get(self, key):
+        """
+        :return: a CachedResponse or None
+        """
+        with self._lock, self._db:
+            row = self._db.execute(
+                'SELECT status, headers, body FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+        status, headers, body = row
+        return CachedResponse(status, json.loads(headers), str(body))
+
+    def set(self, key, status, headers, body):
+        """
+        :param headers: dict of lower case response header names to values
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (key, status, json.dumps(headers), sqlite3.Binary(body), len(body), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evict = []
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        self._db.executemany('DELETE FROM responses WHERE key = ?', evict)
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+
+class TTLCache(object):
+    """
+    JSON-serializable values by key, which expire ttl seconds after they are set
+    """
+
+    def __init__(self, cache_dir, namespace, ttl):
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = _connect(cache_dir, 'entries.sqlite')
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'namespace TEXT, key TEXT, value TEXT, expires REAL, PRIMARY KEY (namespace, key))')
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)')
+
+    def get(self, key):
+        """
+        :return: the value, or None if it is missing or expired
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires > ?',
+                (self.namespace, key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM entries WHERE expires <= ?', (now,))
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                (self.namespace, key, json.dumps(value), now + self.ttl))
+
+
+class ObjectCache(object):
+    """
+    Pickled objects by key, for values that are slow to build from content addressed by its hash,
+    like a compiled OWNERS file by blob SHA. Entries never go stale, past max_entries the least
+    recently used ones are evicted.
+    """
+
+    def __init__(self, cache_dir, namespace, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = _connect(cache_dir, 'objects.sqlite')
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS objects ('
+                'namespace TEXT, key TEXT, value BLOB, accessed REAL, PRIMARY KEY (namespace, key))')
+
+    def get(self, key):
+        """
+        :return: the object, or None if it is missing or can't be unpickled
+        """
+        with self._lock, self._db:
+            row = self._db.execute(
+                'SELECT value FROM objects WHERE namespace = ? AND key = ?', (self.namespace, key)).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                'UPDATE objects SET accessed = ? WHERE namespace = ? AND key = ?', (time.time(), self.namespace, key))
+        try:
+            return pickle.loads(str(row[0]))
+        except Exception:
+            # written by an incompatible version of lgtm
+            return None
+
+    def set(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)',
+                (self.namespace, key, sqlite3.Binary(data), time.time()))
+            self._db.execute(
+                'DELETE FROM objects WHERE namespace = ? AND key NOT IN ('
+                'SELECT key FROM objects WHERE namespace = ? ORDER BY accessed DESC, rowid DESC LIMIT ?)',
+                (self.namespace, self.namespace, self.max_entries))
+
+
+_response_caches = {}
+
+
+def get_response_cache(cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    One ResponseCache per directory and process
+    """
+    key = os.path.abspath(cache_dir)
+    if key not in _response_caches:
+        _response_caches[key] = ResponseCache(cache_dir, max_bytes=max_bytes)
+    return _response_caches[key]
@@ -4,31 +4,33 @@ pull_request_ready_to_merge() with the supplied parameters, prints any logging o
 exits with an appropriate exit code.
 """
 import argparse
+import json
 import logging
 import os
 import sys
-import pkg_resources
 
+from lgtm import __version__
+from lgtm import evaluate_many
 from lgtm import integrations
+from lgtm import pool
 from lgtm import pull_request_ready_to_merge
+from lgtm import stats
 
 
 logger = logging.getLogger(__name__)
 
 
-def get_options_parser(args=None, do_exit=True):
+def add_evaluation_arguments(parser):
     """
-    Parses and validates sys.argv + environment variables into an options object
-    :return: the options object
+    Add the arguments that control how pull requests are evaluated, shared by every mode
     """
-    parser = argparse.ArgumentParser()
     parser.add_argument('--github-token',
                         help='GitHub API Token, can also use GITHUB_TOKEN environment variable',
                         default=os.environ.get('GITHUB_TOKEN'))
-    parser.add_argument('--github-org', help='GitHub organization name')
-    parser.add_argument('--github-repo', help='Pull request repository name')
-    parser.add_argument('--github-pr-number', help='Pull request number')
     parser.add_argument('--owners-file', help='Relative path to OWNERS file', default='OWNERS')
+    parser.add_argument('--hierarchical-owners',
+                        action='store_true',
+                        help='Use the OWNERS file of every directory, each for the files below it')
     parser.add_argument('--skip-approval',
                         action='append',
                         default=[],
@@ -42,17 +44,143 @@ def get_options_parser(args=None, do_exit=True):
                         default=[],
                         dest='skip_notification_branches',
                         help='Do not send notifications for PRs to this branch')
+    parser.add_argument('--local-repo',
+                        help='Read OWNERS files and the changed files from this git checkout instead of '
+                             'the GitHub API')
+    parser.add_argument('--base-ref',
+                        help='Branch the pull request merges into, for --local-repo. Defaults to the '
+                             'base branch of the pull request on GitHub')
+    parser.add_argument('--signoff-source',
+                        choices=['comments', 'reviews', 'both'],
+                        default='comments',
+                        help='Count lgtm comments, approving pull request reviews, or both as sign-offs')
+    parser.add_argument('--lgtm-alias',
+                        action='append',
+                        dest='lgtm_aliases',
+                        help='A regex that signs off when found in a comment, instead of the default '
+                             'lgtm, :shipit: and :+1:. Can be repeated')
+    parser.add_argument('--graphql',
+                        action='store_true',
+                        dest='use_graphql',
+                        help='Load pull request state with one GitHub GraphQL query')
+    parser.add_argument('--accurate-commit-dates',
+                        action='store_true',
+                        help='Fetch every commit to find the most recent commit date (slow)')
+    parser.add_argument('--cache-dir',
+                        help='Directory for caching GitHub API responses between runs, '
+                             'can also use LGTM_CACHE_DIR environment variable',
+                        default=os.environ.get('LGTM_CACHE_DIR'))
+    parser.add_argument('--team-cache-ttl',
+                        type=int,
+                        default=0,
+                        help='Seconds to keep team memberships in --cache-dir between runs')
+    parser.add_argument('--team-workers',
+                        type=int,
+                        help='Number of teams whose members are looked up at once')
+    parser.add_argument('--incremental-comments',
+                        action='store_true',
+                        help='Keep sign-off comments in --cache-dir and only fetch new comments')
+    parser.add_argument('--memoize-results',
+                        action='store_true',
+                        help='Keep the verdict of each pull request in --cache-dir and reuse it while '
+                             'nothing it depends on changes')
+    parser.add_argument('--max-requests-per-second',
+                        type=float,
+                        help='Limit the rate of GitHub API requests, for tokens shared by many jobs')
+    parser.add_argument('--max-rate-limit-wait',
+                        type=float,
+                        help='Fail instead of waiting longer than this many seconds for GitHub API rate '
+                             'limits, 600 by default')
+    parser.add_argument('--http-pool-size',
+                        type=int,
+                        help='Idle keep-alive connections to keep per host')
+    parser.add_argument('--http-timeout',
+                        type=float,
+                        help='Seconds to wait on a GitHub API connection')
+    parser.add_argument('--http-retries',
+                        type=int,
+                        help='Times to retry an idempotent request after a connection error')
+    parser.add_argument('--gzip',
+                        action='store_true',
+                        help='Ask GitHub for gzipped responses')
+    parser.add_argument('--verbose',
+                        help='Print commands that are running and other debug info',
+                        action='store_true')
+
+
+def get_evaluation_options(options):
+    """
+    :param options: parsed arguments from add_evaluation_arguments()
+    :return: the options dict for pull_request_ready_to_merge()
+    """
+    return {'hierarchical_owners': options.hierarchical_owners,
+            'skip_approval_branches': options.skip_approval_branches,
+            'skip_assignment': options.skip_assignment,
+            'skip_notification_branches': options.skip_notification_branches,
+            'local_repo': options.local_repo,
+            'base_ref': options.base_ref,
+            'signoff_source': options.signoff_source,
+            'lgtm_aliases': options.lgtm_aliases,
+            'use_graphql': options.use_graphql,
+            'accurate_commit_dates': options.accurate_commit_dates,
+            'cache_dir': options.cache_dir,
+            'team_cache_ttl': options.team_cache_ttl,
+            'team_workers': options.team_workers,
+            'incremental_comments': options.incremental_comments,
+            'memoize_results': options.memoize_results,
+            'max_requests_per_second': options.max_requests_per_second,
+            'max_rate_limit_wait': options.max_rate_limit_wait,
+            'http_pool_size': options.http_pool_size,
+            'http_timeout': options.http_timeout,
+            'http_retries': options.http_retries,
+            'gzip': options.gzip,
+            }
+
+
+def add_stats_arguments(parser):
+    parser.add_argument('--stats-json',
+                        help='Write timings of each phase and HTTP request counts to this file')
+
+
+def _reset_stats():
+    stats.collector.reset()
+
+
+def _report_stats(options):
+    from lgtm import transport
+    if transport.get_scheduler():
+        logger.debug('Waited %.1fs for GitHub API rate limits' % transport.get_scheduler().total_wait)
+    for line in stats.collector.summary_lines():
+        logger.debug(line)
+    if options.stats_json:
+        with open(options.stats_json, 'w') as f:
+            json.dump(stats.collector.as_dict(), f, indent=2, sort_keys=True)
+
+
+def _configure_logging(options):
+    logging.basicConfig(format='%(message)s')
+    # every lgtm module, so waits for GitHub API rate limits are shown too
+    logging.getLogger('lgtm').setLevel(logging.DEBUG if options.verbose else logging.INFO)
+
+
+def get_options_parser(args=None, do_exit=True):
+    """
+    Parses and validates sys.argv + environment variables into an options object
+    :return: the options object
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--github-org', help='GitHub organization name')
+    parser.add_argument('--github-repo', help='Pull request repository name')
+    parser.add_argument('--github-pr-number', help='Pull request number')
+    add_evaluation_arguments(parser)
+    add_stats_arguments(parser)
     parser.add_argument('--integration',
                         help='Extract org/repo/pr from environment variables specific to a platform',
                         choices=['jenkins', 'travis'],
                         default=None)
     parser.add_argument('--version', help='Print version and exit', action='store_true')
-    parser.add_argument('--verbose',
-                        help='Print commands that are running and other debug info',
-                        action='store_true')
     options = parser.parse_args(args)
-    logging.basicConfig(format='%(message)s')
-    logger.setLevel(logging.DEBUG if options.verbose else logging.INFO)
+    _configure_logging(options)
     if options.integration:
         defaults = integrations.get_options_defaults_dict(options.integration)
         for option, value in defaults.items():
@@ -69,26 +197,158 @@ def get_options_parser(args=None, do_exit=True):
     return options
 
 
+def get_serve_options_parser(args=None, do_exit=True):
+    """
+    Parses and validates the arguments to `lgtm serve`
+    :return: the options object
+    """
+    parser = argparse.ArgumentParser(prog='lgtm serve')
+    add_evaluation_arguments(parser)
+    parser.add_argument('--host', help='Interface to listen on', default='0.0.0.0')
+    parser.add_argument('--port', help='Port to listen on', type=int, default=8000)
+    parser.add_argument('--webhook-secret',
+                        help='Secret configured on the GitHub webhook, can also use '
+                             'LGTM_WEBHOOK_SECRET environment variable',
+                        default=os.environ.get('LGTM_WEBHOOK_SECRET'))
+    parser.add_argument('--status-context',
+                        help='Name of the commit status to publish',
+                        default='lgtm')
+    options = parser.parse_args(args)
+    _configure_logging(options)
+    if not options.github_token:
+        parser.print_usage()
+        if do_exit:
+            exit()
+    return options
+
+
+def get_batch_options_parser(args=None, do_exit=True):
+    """
+    Parses and validates the arguments to `lgtm batch`
+    :return: the options object
+    """
+    parser = argparse.ArgumentParser(prog='lgtm batch')
+    add_evaluation_arguments(parser)
+    add_stats_arguments(parser)
+    parser.add_argument('--input',
+                        help='File of pull requests, one JSON object per line with org, repo and '
+                             'pr_number keys. Reads stdin by default',
+                        default='-')
+    parser.add_argument('--max-workers',
+                        help='Number of pull requests evaluated at once',
+                        type=int,
+                        default=pool.DEFAULT_MAX_WORKERS)
+    options = parser.parse_args(args)
+    _configure_logging(options)
+    if not options.github_token:
+        parser.print_usage()
+        if do_exit:
+            exit()
+    return options
+
+
+def _write_record(output, record):
+    output.write(json.dumps(record, sort_keys=True) + '\n')
+    output.flush()
+
+
+def _read_pull_request_refs(lines, output, errors):
+    """
+    Parse JSON lines into (org, repo, pr_number) tuples. Lines that can't be parsed are reported in
+    output right away and counted in errors.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            ref = json.loads(line)
+            yield ref['org'], ref['repo'], int(ref['pr_number'])
+        except (ValueError, KeyError, TypeError) as e:
+            errors.append(e)
+            _write_record(output, {'input': line, 'error': 'Bad pull request reference: %s' % e})
+
+
+def batch(args=None, do_exit=True, stdin=None, stdout=None):
+    """
+    Evaluate many pull requests in one process, with shared connections and caches. Writes one
+    JSON object per pull request to stdout, in the order the evaluations finish.
+    :return: Zero if every pull request was evaluated, one if any of them failed
+    """
+    options = get_batch_options_parser(args, do_exit=do_exit)
+    output = stdout or sys.stdout
+    lines = open(options.input) if options.input != '-' else (stdin or sys.stdin)
+    errors = []
+    _reset_stats()
+    try:
+        results = evaluate_many(
+            github_token=options.github_token,
+            pull_requests=_read_pull_request_refs(lines, output, errors),
+            owners_file=options.owners_file,
+            options=get_evaluation_options(options),
+            max_workers=options.max_workers)
+        for result in results:
+            record = {'org': result.org, 'repo': result.repo, 'pr_number': result.pr_number,
+                      'ready': result.ready}
+            if result.error:
+                errors.append(result.error)
+                record['error'] = repr(result.error)
+            _write_record(output, record)
+    finally:
+        if options.input != '-':
+            lines.close()
+    _report_stats(options)
+    return 1 if errors else 0
+
+
+def serve(args=None, do_exit=True):
+    """
+    Run the webhook server until interrupted
+    """
+    from lgtm import server
+    options = get_serve_options_parser(args, do_exit=do_exit)
+    webhook_server = server.WebhookServer(
+        (options.host, options.port),
+        github_token=options.github_token,
+        owners_file=options.owners_file,
+        options=get_evaluation_options(options),
+        secret=options.webhook_secret,
+        status_context=options.status_context)
+    logger.info('Listening for GitHub webhooks on %s:%d' % webhook_server.server_address)
+    try:
+        webhook_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        webhook_server.server_close()
+    return 0
+
+
 def main(args=None, do_exit=True):
     """
     The main body of the lgtm command line tool
     :return: Zero if the PR is ready to merge, one if it's not
     """
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] == 'serve':
+        return serve(args[1:], do_exit=do_exit)
+    if args and args[0] == 'batch':
+        return batch(args[1:], do_exit=do_exit)
     options = get_options_parser(args, do_exit=do_exit)
     if options.version:
-        logger.info(pkg_resources.require('lgtm')[0].version)
+        logger.info(__version__)
         return 0
+    _reset_stats()
     ready_to_merge = pull_request_ready_to_merge(
         github_token=options.github_token,
         org=options.github_org,
         repo=options.github_repo,
         pr_number=options.github_pr_number,
         owners_file=options.owners_file,
-        options={'skip_approval_branches': options.skip_approval_branches,
-                 'skip_assignment': options.skip_assignment,
-                 'skip_notification_branches': options.skip_notification_branches,
-                 }
+        options=get_evaluation_options(options),
     )
+    _report_stats(options)
     if ready_to_merge:
         logger.info('Pull request is ready to merge.')
         return 0
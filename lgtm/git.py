@@ -1,9 +1,22 @@
+import base64
+import collections
+import httplib
 import logging
 import re
+import threading
+import time
+import urllib
 
 from dateutil import parser as dateutil_parser
 from github import Github as PyGithub
 from github import UnknownObjectException
+from github.Team import Team as PyGithubTeam
+import cache
+import graphql
+import owners
+import pool
+import stats
+import transport
 import utils
 
 from utils import DEFAULT_REVIEW_COMMENT_PREFIX
@@ -19,61 +32,366 @@ LGTM_ALIASES = [
 ]
 LGTM_ALIAS_RE = re.compile(r'|'.join(LGTM_ALIASES))
 
+# regex syntax that makes an alias more than a literal string
+_REGEX_SYNTAX_RE = re.compile(r'[.^$*+?{}\[\]|()\\]')
+
+# an escaped character, or any other character
+_REGEX_TOKEN_RE = re.compile(r'\\(.)|(.)', re.DOTALL)
+
+
+def _alias_literal(alias):
+    """
+    :return: (literal, ignore_case) when alias matches nothing but a literal string, optionally
+        case insensitive and on word boundaries, otherwise None
+    """
+    ignore_case = alias.startswith('(?i)')
+    pattern = alias[len('(?i)'):] if ignore_case else alias
+    literal = []
+    for escaped, char in _REGEX_TOKEN_RE.findall(pattern):
+        if escaped == 'b':
+            # a word boundary, which the regex checks once the literal is found
+            continue
+        elif escaped:
+            # escaped punctuation is literal, escaped letters and digits are classes or references
+            if re.match(r'\w', escaped):
+                return None
+            literal.append(escaped)
+        elif _REGEX_SYNTAX_RE.match(char):
+            return None
+        else:
+            literal.append(char)
+    literal = ''.join(literal)
+    return (literal.lower() if ignore_case else literal), ignore_case
+
+
+class SignOffDetector(object):
+    """
+    Finds the sign-offs in a batch of comments. Comments are filtered on author and date first,
+    and once an author has signed off their later comments are skipped, so only the bodies that can
+    change the result are scanned. The aliases are compiled into a single regex. When every alias
+    is a plain string, like the default ones, a body is first searched for those strings, which is
+    far faster than the regex on the long comments bots post, and only confirmed with the regex when
+    one is found.
+    """
+
+    def __init__(self, aliases=None):
+        """
+        :param aliases: regexes that sign off when found in a comment, LGTM_ALIASES by default
+        """
+        self.aliases = list(aliases or LGTM_ALIASES)
+        self.regex = re.compile(r'|'.join(self.aliases))
+        self._literals = [_alias_literal(alias) for alias in self.aliases]
+        if None in self._literals:
+            self._literals = None
+        elif self.regex.flags & re.IGNORECASE:
+            # a (?i) in any alias makes the whole combined regex case insensitive
+            self._literals = [(literal.lower(), True) for literal, ignore_case in self._literals]
+
+    def matches(self, body):
+        """
+        :return: whether body contains a sign-off alias
+        """
+        if self._literals is not None:
+            lowered = None
+            for literal, ignore_case in self._literals:
+                if ignore_case:
+                    if lowered is None:
+                        lowered = body.lower()
+                    if literal in lowered:
+                        break
+                elif literal in body:
+                    break
+            else:
+                return False
+        return self.regex.search(body) is not None
+
+    def comment_matches(self, comment):
+        """
+        Like matches(), for a comment. The result is kept on comments that have a signs_off
+        attribute, so each body is only scanned once.
+        """
+        signs_off = getattr(comment, 'signs_off', None)
+        if signs_off is None:
+            signs_off = self.matches(comment.body)
+            if hasattr(comment, 'signs_off'):
+                comment.signs_off = signs_off
+        return signs_off
+
+    def signed_off_by(self, comments, since=None, except_login=None):
+        """
+        :param comments: comments with user.login, created_at and body, oldest first
+        :param since: ignore the comments created before this datetime
+        :param except_login: a GitHub user name whose comments are ignored
+        :return: the GitHub user names who signed off, in the order they did
+        """
+        signed_off = []
+        skipped = set([except_login])
+        for comment in comments:
+            login = comment.user.login
+            if login in skipped or (since and comment.created_at < since):
+                continue
+            if self.comment_matches(comment):
+                signed_off.append(login)
+                skipped.add(login)
+        return signed_off
+
+
+# where sign-offs are read from: lgtm comments, approving pull request reviews, or both
+SIGNOFF_SOURCES = ('comments', 'reviews', 'both')
+
+# review states that replace a reviewer's earlier verdict, COMMENTED and PENDING reviews do not
+OPINIONATED_REVIEW_STATES = ('APPROVED', 'CHANGES_REQUESTED', 'DISMISSED')
+
+# seconds to keep the sign-off state of a pull request that is not evaluated again
+COMMENT_STATE_TTL = 30 * 24 * 60 * 60
+
+# teams whose members are looked up at once by expand_teams()
+DEFAULT_TEAM_WORKERS = 4
+
+
+def _get_team_by_slug(org, team_slug):
+    if hasattr(org, 'get_team_by_slug'):
+        return org.get_team_by_slug(team_slug)
+    # older PyGithub versions have no direct lookup, GET /orgs/:org/teams/:slug ourselves
+    url = '%s/teams/%s' % (org.url, urllib.quote(team_slug.encode('utf-8'), safe=''))
+    headers, data = org._requester.requestJsonAndCheck('GET', url)
+    return PyGithubTeam(org._requester, headers, data, completed=True)
+
+
+class TeamResolver(object):
+    """
+    Resolves team names to member logins. Teams are looked up directly by slug, falling back to
+    listing the organization's teams and matching by name. Memberships are memoized for the life of
+    the resolver, or for max_age seconds, and can also be shared between runs through a
+    cache.TTLCache. GitHub includes the members of nested child teams in a team's member list, so
+    cached memberships are fully expanded.
+    """
+
+    def __init__(self, ttl_cache=None, max_age=None):
+        self._ttl_cache = ttl_cache
+        self.max_age = max_age
+        self._members = {}
+
+    def _fetch_members(self, org, team_name):
+        try:
+            team = _get_team_by_slug(org, team_name)
+        except (UnknownObjectException, httplib.InvalidURL):
+            # a team name like 'Team One' is not a slug
+            teams = [t for t in org.get_teams() if t.name == team_name]
+            if not teams:
+                return []
+            team = teams[0]
+        return [utils.intern_login(m.login) for m in team.get_members()]
+
+    def get_members(self, git_hub, team_name):
+        """
+        :param git_hub: the GitHub helper for the organization that owns the team
+        :param team_name: team slug or name, without the organization
+        :return: a list of GitHub user names
+        """
+        key = '%s/%s' % (git_hub.org_name, team_name)
+        members, fetched_at = self._members.get(key, (None, None))
+        if members is None or (self.max_age is not None and time.time() - fetched_at > self.max_age):
+            members = self._ttl_cache.get(key) if self._ttl_cache else None
+            if members is None:
+                members = self._fetch_members(git_hub.org, team_name)
+                if self._ttl_cache:
+                    self._ttl_cache.set(key, members)
+            self._members[key] = (members, time.time())
+        return list(members)
+
 
 class GitHub(object):
     """
     Wrapper around PyGithub with helpers for getting repo owners, a handle to pull request object.
     """
 
-    def __init__(self, github_token, org_name, repo_name):
+    def __init__(self, github_token, org_name, repo_name, use_graphql=False, graphql_url=None,
+                 cache_dir=None, team_cache_ttl=None, team_resolver=None, max_requests_per_second=None,
+                 incremental_comments=False, team_workers=DEFAULT_TEAM_WORKERS, memoize_results=False,
+                 http_pool_size=None, http_timeout=None, http_retries=None, gzip=False, lgtm_aliases=None,
+                 max_rate_limit_wait=None):
+        """
+        :param cache_dir: optional directory for an on-disk cache of API responses, shared by every
+            GitHub client in this process
+        :param team_cache_ttl: seconds to keep team memberships in cache_dir between runs
+        :param team_resolver: a TeamResolver to share with other GitHub helpers
+        :param max_requests_per_second: optional limit on the rate of GitHub API requests made by
+            this process, on top of the pacing done when the hourly quota runs low
+        :param incremental_comments: keep the sign-off comments of each pull request in cache_dir,
+            and only fetch the comments added or edited since the last run
+        :param team_workers: maximum number of teams whose members are looked up at once, 1 to look
+            them up one at a time
+        :param memoize_results: keep the verdict of each evaluation in cache_dir, and reuse it while
+            nothing it depends on changes, see lgtm.results
+        :param http_pool_size: idle keep-alive connections to keep per host, shared by every GitHub
+            client in this process
+        :param http_timeout: socket timeout in seconds of GitHub API requests
+        :param http_retries: times an idempotent request is sent again after a connection error
+        :param gzip: ask GitHub for gzipped responses
+        :param lgtm_aliases: regexes that sign off when found in a comment, LGTM_ALIASES by default
+        :param max_rate_limit_wait: longest wait in seconds for GitHub API rate limits before failing,
+            ratelimit.DEFAULT_MAX_WAIT by default
+        """
+        transport.install()
+        transport.configure_connections(pool_size=http_pool_size, timeout=http_timeout, retries=http_retries)
+        if gzip:
+            transport.set_gzip(True)
+        if max_requests_per_second and transport.get_scheduler():
+            transport.get_scheduler().set_rate(max_requests_per_second)
+        if max_rate_limit_wait is not None and transport.get_scheduler():
+            transport.get_scheduler().max_wait = max_rate_limit_wait
+        if cache_dir:
+            transport.set_response_cache(cache.get_response_cache(cache_dir))
         self._git_api = PyGithub(github_token)
+        self._graphql = None
+        if use_graphql:
+            self._graphql = graphql.GraphQLClient(github_token, url=graphql_url or graphql.GITHUB_GRAPHQL_URL)
         self.org_name = org_name
         self.repo_name = repo_name
-        self.org = None
-        self.repo = None
-        self.current_user_login = None
+        if team_resolver is None:
+            ttl_cache = None
+            if cache_dir and team_cache_ttl:
+                ttl_cache = cache.TTLCache(cache_dir, 'teams', ttl=team_cache_ttl)
+            team_resolver = TeamResolver(ttl_cache=ttl_cache)
+        self.team_resolver = team_resolver
+        self.sign_off_detector = SignOffDetector(lgtm_aliases)
+        self.team_workers = team_workers
+        self.owners_cache = None
+        if cache_dir:
+            self.owners_cache = cache.ObjectCache(cache_dir, 'owners-v%d' % owners.MATCHER_FORMAT_VERSION)
+        self._owners_matchers = {}
+        self._owners_trees = {}
+        self.comment_state_cache = None
+        # GraphQL already loads every comment with the pull request
+        if cache_dir and incremental_comments and not use_graphql:
+            self.comment_state_cache = cache.TTLCache(cache_dir, 'comments', ttl=COMMENT_STATE_TTL)
+        self.result_cache = None
+        if cache_dir and memoize_results:
+            self.result_cache = cache.TTLCache(cache_dir, 'results', ttl=COMMENT_STATE_TTL)
+        self._lock = threading.RLock()
+        self.invalidate()
 
-    def _connect(self):
-        self.org = self._git_api.get_organization(self.org_name)
-        self.repo = self.org.get_repo(self.repo_name)
-        self.current_user_login = self._git_api.get_user().name
+    def invalidate(self):
+        """
+        Forget the organization, repository and current user, they will be fetched again on next use
+        """
+        self._org = None
+        self._repo = None
+        self._current_user_login = None
 
+    @property
+    def org(self):
+        with self._lock:
+            if self._org is None:
+                self._org = self._git_api.get_organization(self.org_name)
+            return self._org
+
+    @property
+    def repo(self):
+        with self._lock:
+            if self._repo is None:
+                self._repo = self.org.get_repo(self.repo_name)
+            return self._repo
+
+    @property
+    def current_user_login(self):
+        with self._lock:
+            if self._current_user_login is None:
+                self._current_user_login = self._git_api.get_user().name
+            return self._current_user_login
+
+    @stats.timed('GitHub.read_file_lines')
     def read_file_lines(self, file_path='OWNERS'):
         """
         Get a list of strings, one per line in the file
         :param owners_file: A relative path to the file
         :return: a list of line strings
         """
-        self._connect()
         try:
             owner_file_contents = self.repo.get_file_contents(file_path)
             return owner_file_contents.decoded_content.split('\n')
         except UnknownObjectException:
             return []
 
-    def get_pull_request(self, pr_number):
+    @stats.timed('GitHub.get_owners_matcher')
+    def get_owners_matcher(self, file_path='OWNERS'):
+        """
+        Get the compiled rules of an OWNERS file. They are cached by the blob SHA of the file, in
+        memory and in cache_dir, so an unchanged file is neither decoded nor parsed again.
+        :param file_path: A relative path to the file
+        :return: an owners.OwnersMatcher
+        """
+        try:
+            contents = self.repo.get_file_contents(file_path)
+        except UnknownObjectException:
+            return owners.compile_matcher([])
+        return self._get_owners_matcher_by_sha(contents.sha, lambda: contents.decoded_content)
+
+    def _get_owners_matcher_by_sha(self, sha, get_content):
+        with self._lock:
+            matcher = self._owners_matchers.get(sha)
+        if matcher is None and self.owners_cache is not None:
+            matcher = self.owners_cache.get(sha)
+        if matcher is None:
+            matcher = owners.compile_owners_file(get_content().split('\n'))
+            if self.owners_cache is not None:
+                self.owners_cache.set(sha, matcher)
+        with self._lock:
+            self._owners_matchers[sha] = matcher
+        return matcher
+
+    @stats.timed('GitHub.get_owners_tree')
+    def get_owners_tree(self, file_name='OWNERS'):
+        """
+        Get the OWNERS files of every directory on the default branch, from one recursive git tree
+        request. Only files whose blob SHA has not been compiled before are downloaded.
+        :param file_name: The name of the OWNERS files, like 'OWNERS'
+        :return: an owners.OwnersTree
+        """
+        tree = self.repo.get_git_tree(self.repo.default_branch, recursive=True)
+        with self._lock:
+            owners_tree = self._owners_trees.get(tree.sha)
+        if owners_tree is not None:
+            return owners_tree
+        matchers = {}
+        for element in tree.tree:
+            if element.type != 'blob' or element.path.rsplit('/', 1)[-1] != file_name:
+                continue
+            directory = element.path[:-len(file_name)].rstrip('/')
+            matchers[directory] = self._get_owners_matcher_by_sha(
+                element.sha, lambda sha=element.sha: base64.b64decode(self.repo.get_git_blob(sha).content))
+        owners_tree = owners.OwnersTree(matchers)
+        with self._lock:
+            self._owners_trees[tree.sha] = owners_tree
+        return owners_tree
+
+    @stats.timed('GitHub.get_pull_request')
+    def get_pull_request(self, pr_number, accurate_commit_dates=False, signoff_source='comments'):
         """
         :param pr_number: A GitHub pull request ID
+        :param accurate_commit_dates: Fetch every commit to date it, see PullRequest.last_commit_date
+        :param signoff_source: One of SIGNOFF_SOURCES, see PullRequest.signed_off_by()
         :return: Handle to PullRequest helper
         """
-        self._connect()
-        return PullRequest(self, pr_number)
+        pr = None
+        if self._graphql:
+            pr = graphql.PullRequest(self._graphql, self.org_name, self.repo_name, pr_number)
+        return PullRequest(self, pr_number, pr=pr, accurate_commit_dates=accurate_commit_dates,
+                           comment_state_cache=self.comment_state_cache, signoff_source=signoff_source)
 
+    @stats.timed('GitHub.get_team_members')
     def get_team_members(self, team_name):
         """
         Returns a list of GitHub user names for the members of a GitHub team
         :param team_name: GitHub team name, like 'OrgName/team1'
         :return: a list of GitHub user names
         """
-        self._connect()
         assert '/' in team_name
         org, team_name = team_name.split('/')  # ex: NerdWallet/dit
-        teams = self.org.get_teams()
-        teams = [t for t in teams if t.name == team_name]
-        if not teams:
-            return []
-        return [m.login for m in teams[0].get_members()]
+        return self.team_resolver.get_members(self, team_name)
 
+    @stats.timed('GitHub.expand_teams')
     def expand_teams(self, logins_and_teams_list, except_login=None):
         """
         Given a list of GitHub user names and team names, return a set of user names with the team
@@ -81,18 +399,142 @@ class GitHub(object):
         :param logins_and_teams_list: list of GitHub user names and team names
         :return: list of GitHub user names
         """
-        self._connect()
+        team_names = utils.ordered_set(
+            name for name in logins_and_teams_list if '/' in name and name != except_login)
+        team_members = dict(zip(team_names, self.get_members_of_teams(team_names)))
         logins = list()
         for login_or_team in logins_and_teams_list:
             if login_or_team == except_login:
                 continue
             if '/' in login_or_team:
-                for login in self.get_team_members(login_or_team):
+                for login in team_members[login_or_team]:
                     logins.append(login)
             else:
                 logins.append(login_or_team)
         return utils.ordered_set(logins)
 
+    def get_members_of_teams(self, team_names):
+        """
+        Look up the members of several teams, up to team_workers of them at once. The threads share
+        this helper's PyGithub client, so requests are still paced and cached by the transport.
+        :param team_names: list of GitHub team names, like 'OrgName/team1'
+        :return: a list with the list of member user names of each team, in the order of team_names
+        """
+        if self.team_workers <= 1 or len(team_names) <= 1:
+            return [self.get_team_members(team_name) for team_name in team_names]
+        members = []
+        for result in pool.imap(self.get_team_members, team_names, max_workers=self.team_workers):
+            if result.exc_info:
+                # with the traceback of the worker thread
+                raise result.exc_info[0], result.exc_info[1], result.exc_info[2]
+            members.append(result.value)
+        return members
+
+
+_CommentUser = collections.namedtuple('_CommentUser', ['login'])
+
+# the parts of a PyGithub PullRequestReview that signed_off_by() reads
+_Review = collections.namedtuple('_Review', ['user', 'state', 'commit_id'])
+
+
+class _SnapshotComment(object):
+    """
+    A comment with the parts of a PyGithub IssueComment that signed_off_by() reads, instead of the
+    whole object with its raw JSON. Whether it signs off is kept once SignOffDetector has scanned it,
+    and the body of a comment that doesn't, like a long coverage report, is let go.
+    """
+    __slots__ = ('id', 'user', 'created_at', 'body', '_signs_off')
+
+    def __init__(self, comment):
+        self.id = comment.id
+        self.user = _CommentUser(utils.intern_login(comment.user.login))
+        self.created_at = comment.created_at
+        self.body = comment.body
+        self._signs_off = None
+
+    @property
+    def signs_off(self):
+        return self._signs_off
+
+    @signs_off.setter
+    def signs_off(self, signs_off):
+        self._signs_off = signs_off
+        if signs_off is False:
+            self.body = ''
+
+
+class _StoredComment(object):
+    """
+    A comment kept in the incremental sign-off state, with the parts of a PyGithub IssueComment
+    that PullRequest reads
+    """
+    __slots__ = ('_issue', 'id', 'user', 'created_at', 'body', 'signs_off')
+
+    def __init__(self, issue, id, login, created_at, body):
+        self._issue = issue
+        self.id = id
+        self.user = _CommentUser(utils.intern_login(login))
+        self.created_at = dateutil_parser.parse(created_at)
+        self.body = body
+        self.signs_off = None
+
+    def edit(self, body):
+        self._issue.get_comment(self.id).edit(body)
+        self.body = body
+        self.signs_off = None
+
+
+class CommentSnapshot(object):
+    """
+    The comments of a pull request, fetched once per evaluation, with lgtm's review comments indexed
+    by author, so every check reads the same list without fetching it again.
+    With compact, comments are kept as small records instead of the PyGithub objects with their raw
+    JSON. Their bodies are only scanned for sign-offs by SignOffDetector, once, after the comments
+    that can't sign off have been filtered out by author and date.
+    """
+
+    def __init__(self, comments, compact=False):
+        self.comments = []
+        self.review_comments = {}
+        self._compact = compact
+        for comment in comments:
+            self.add(comment)
+
+    def add(self, comment):
+        author = comment.user.login
+        if self._compact and not comment.body.startswith(DEFAULT_REVIEW_COMMENT_PREFIX):
+            # review comments are kept whole, to be edited
+            comment = _SnapshotComment(comment)
+        self.comments.append(comment)
+        if author not in self.review_comments and comment.body.startswith(DEFAULT_REVIEW_COMMENT_PREFIX):
+            self.review_comments[author] = comment
+
+    def get_review_comment(self, login):
+        """
+        :return: the first comment by login that starts with the review comment prefix, or None
+        """
+        return self.review_comments.get(login)
+
+
+class PullRequestSnapshot(object):
+    """
+    The fields of a pull request that the sign-off decision reads
+    """
+    __slots__ = ('number', 'author', 'base_branch', 'head_sha')
+
+    def __init__(self, number, author, base_branch, head_sha):
+        self.number = number
+        self.author = utils.intern_login(author)
+        self.base_branch = base_branch
+        self.head_sha = head_sha
+
+    @classmethod
+    def from_pull_request(cls, number, pr):
+        """
+        :param pr: a PyGithub or graphql.PullRequest
+        """
+        return cls(number, pr.user.login, pr.base.ref, pr.head.sha)
+
 
 class PullRequest(object):
     """
@@ -101,18 +543,46 @@ class PullRequest(object):
     determine whether a pull request has been signed off on by the required reviewers.
     """
 
-    def __init__(self, git_hub, pr_number):
+    def __init__(self, git_hub, pr_number, pr=None, accurate_commit_dates=False, comment_state_cache=None,
+                 signoff_source='comments'):
+        """
+        :param pr: optional pre-loaded pull request, like a graphql.PullRequest; fetched with the
+            REST API by default
+        :param accurate_commit_dates: see last_commit_date
+        :param comment_state_cache: optional cache.TTLCache for incremental sign-off state, see
+            get_sign_off_comments()
+        :param signoff_source: One of SIGNOFF_SOURCES, see signed_off_by()
+        """
+        assert signoff_source in SIGNOFF_SOURCES, signoff_source
         self._git_hub = git_hub
         self.pr_number = pr_number
-        self._pr = git_hub.repo.get_pull(self.pr_number)
+        self.accurate_commit_dates = accurate_commit_dates
+        self.signoff_source = signoff_source
+        pr = pr or git_hub.repo.get_pull(self.pr_number)
+        self.snapshot = PullRequestSnapshot.from_pull_request(pr_number, pr)
+        self._pr = pr
+        self._comment_state_cache = comment_state_cache
+        self._comment_snapshot = None
+        self._latest_reviews = None
 
     @property
     def base_branch(self):
-        return self._pr.base.ref
+        return self.snapshot.base_branch
+
+    @property
+    def head_sha(self):
+        return self.snapshot.head_sha
+
+    def iter_files(self):
+        """
+        Generates the paths of the changed files, fetching pages from GitHub as they are consumed
+        """
+        for f in self._pr.get_files():
+            yield f.filename
 
     @property
     def files(self):
-        return [f.filename for f in self._pr.get_files()]
+        return list(self.iter_files())
 
     @property
     def comments(self):
@@ -124,16 +594,86 @@ class PullRequest(object):
         return comments
 
     @property
+    def comment_snapshot(self):
+        """
+        The comments that can sign off on the pull request or that lgtm posted itself, fetched on
+        first use and kept for the life of this object.
+        Every comment is fetched, and the matching ones are kept. With a comment_state_cache, the
+        matching comments are also kept in the cache, along with a watermark: the head SHA, the time
+        of the last comment seen and the number of comments. Later runs only fetch the comments
+        added or edited since the watermark. A new head commit starts over with every comment, and
+        so does a deleted comment, found when the issue has fewer comments than were seen.
+        :return: a CommentSnapshot
+        """
+        if self._comment_snapshot is None:
+            self._comment_snapshot = self._load_comment_snapshot()
+        return self._comment_snapshot
+
+    @stats.timed('PullRequest.load_comments')
+    def _load_comment_snapshot(self):
+        if self._comment_state_cache is None:
+            return CommentSnapshot(self.comments, compact=True)
+        return CommentSnapshot(self._update_comment_state())
+
+    def get_sign_off_comments(self):
+        """
+        :return: the list of comments in comment_snapshot
+        """
+        return self.comment_snapshot.comments
+
+    def _update_comment_state(self):
+        key = '%s/%s/%s' % (self._git_hub.org_name, self._git_hub.repo_name, self.pr_number)
+        state = self._comment_state_cache.get(key)
+        if state and state['head_sha'] != self.head_sha:
+            state = None
+        issue = self._git_hub.repo.get_issue(self.pr_number)
+        new_comments = None
+        if state and state['since']:
+            # since matches comments updated at or after the time, the last one is seen again
+            new_comments = list(issue.get_comments(since=dateutil_parser.parse(state['since'])))
+            added = len([c for c in new_comments if c.id > state['last_comment_id']])
+            if state.get('comment_count') is not None and state['comment_count'] + added == issue.comments:
+                state['comment_count'] += added
+                comments = dict((c[0], c) for c in state['comments'])
+            else:
+                # a comment was deleted, which listing by since does not show
+                new_comments = None
+        if new_comments is None:
+            new_comments = list(issue.get_comments())
+            state = {'head_sha': self.head_sha, 'since': None, 'last_comment_id': None,
+                     'comment_count': len(new_comments)}
+            comments = {}
+        for comment in new_comments:
+            comments.pop(comment.id, None)
+            if self._git_hub.sign_off_detector.matches(comment.body) or \
+                    comment.body.startswith(DEFAULT_REVIEW_COMMENT_PREFIX):
+                comments[comment.id] = [comment.id, comment.user.login, comment.created_at.isoformat(),
+                                        comment.body]
+            updated_at = (comment.updated_at or comment.created_at).isoformat()
+            if state['since'] is None or updated_at > state['since']:
+                state['since'] = updated_at
+            state['last_comment_id'] = max(state['last_comment_id'] or 0, comment.id)
+        state['comments'] = sorted(comments.values())
+        self._comment_state_cache.set(key, state)
+        return [_StoredComment(issue, *comment) for comment in state['comments']]
+
+    @property
+    @stats.timed('PullRequest.last_commit_date')
     def last_commit_date(self):
         """
-        Gets the date of the most recent commit on a pull request.
+        Gets the date of the most recent commit on a pull request. Uses the committer dates that
+        are already in the commit list. With accurate_commit_dates, each commit is fetched for
+        its Last-Modified header instead, which costs one request per commit.
         :return: a datetime object
         """
         commits = self._pr.get_commits()
         commit_dates = []
         for c in commits:
-            c.commit.raw_headers  # force PyGithub to give an accurate last_modified date
-            commit_dates.append(dateutil_parser.parse(c.commit.last_modified).replace(tzinfo=None))
+            if self.accurate_commit_dates:
+                c.commit.raw_headers  # force PyGithub to give an accurate last_modified date
+                commit_dates.append(dateutil_parser.parse(c.commit.last_modified).replace(tzinfo=None))
+            elif c.commit.committer and c.commit.committer.date:
+                commit_dates.append(c.commit.committer.date.replace(tzinfo=None))
         return max(commit_dates) if commit_dates else None
 
     @property
@@ -142,8 +682,9 @@ class PullRequest(object):
         Get the GitHub user name of the pull request author
         :return: a GitHub user name
         """
-        return self._pr.user.login
+        return self.snapshot.author
 
+    @stats.timed('PullRequest.assign_to')
     def assign_to(self, login):
         """
         Assign a PR to a specific user.
@@ -156,15 +697,22 @@ class PullRequest(object):
         except UnknownObjectException:
             logger.warn('Cannot assign issue to %r, issue not found' % login)
 
+    @stats.timed('PullRequest.set_status')
+    def set_status(self, state, description=None, context='lgtm'):
+        """
+        Publish a commit status on the head commit of the pull request.
+
+        :param state: 'pending', 'success', 'failure' or 'error'
+        :param description: A short summary shown next to the status
+        :param context: Label that tells this status apart from other checks
+        """
+        commit = self._git_hub.repo.get_commit(self.head_sha)
+        commit.create_status(state, description=description, context=context)
+
     def _get_existing_comment(self):
-        for comment in self.comments:
-            author = comment.user.login
-            if author != self._git_hub.current_user_login:
-                continue
-            if comment.body.startswith(DEFAULT_REVIEW_COMMENT_PREFIX):
-                return comment
-        return None
+        return self.comment_snapshot.get_review_comment(self._git_hub.current_user_login)
 
+    @stats.timed('PullRequest.create_or_update_comment')
     def create_or_update_comment(self, message):
         """
         Notify a list of GitHub user names that they should review this pull request. Only notifies
@@ -184,7 +732,7 @@ class PullRequest(object):
                 return
             existing_comment.edit(message)
         else:
-            self._pr.create_issue_comment(message)
+            self.comment_snapshot.add(self._pr.create_issue_comment(message))
 
     def one_has_signed_off(self, reviewers):
         if not reviewers:
@@ -206,23 +754,76 @@ class PullRequest(object):
                 return False
         return True
 
+    @property
+    def latest_reviews(self):
+        """
+        The latest review that approved, requested changes or was dismissed, by reviewer. Fetched
+        on first use and kept for the life of this object.
+        :return: a dict of GitHub user name to review
+        """
+        if self._latest_reviews is None:
+            self._latest_reviews = self._load_latest_reviews()
+        return self._latest_reviews
+
+    @stats.timed('PullRequest.load_reviews')
+    def _load_latest_reviews(self):
+        latest_reviews = {}
+        # reviews are listed oldest first
+        for review in self._pr.get_reviews():
+            if review.user and review.state in OPINIONATED_REVIEW_STATES:
+                login = utils.intern_login(review.user.login)
+                latest_reviews[login] = _Review(_CommentUser(login), review.state, review.commit_id)
+        return latest_reviews
+
+    def sign_off_state(self):
+        """
+        Everything signed_off_by() reads that can change without a new commit: the comments that
+        sign off or that lgtm posted itself, and the latest reviews when they count
+        :return: a list that can be serialized to JSON
+        """
+        state = []
+        for comment in self.get_sign_off_comments():
+            if self._git_hub.sign_off_detector.comment_matches(comment) or \
+                    comment.body.startswith(DEFAULT_REVIEW_COMMENT_PREFIX):
+                state.append([comment.id, comment.user.login, comment.created_at.isoformat(), comment.body])
+        if self.signoff_source in ('reviews', 'both'):
+            for login, review in sorted(self.latest_reviews.items()):
+                state.append([login, review.state, review.commit_id])
+        return state
+
+    @stats.timed('PullRequest.signed_off_by')
     def signed_off_by(self, except_login=None):
         """
-        Get the list of GitHub user names who have signed off on the pull request.
+        Get the list of GitHub user names who have signed off on the pull request. Depending on
+        signoff_source, a sign-off is an lgtm comment made after the most recent commit, an
+        approving review of the head commit, or either one. With both, a reviewer whose latest
+        review of the head commit requests changes has not signed off, whatever they commented.
         :param except_login: A GitHub user name who should not be allowed to sign off
         :return: A list of GitHub user names
         """
         except_login = except_login or self.author
         lgtm_logins = list()
-        last_commit_date = self.last_commit_date
-        for comment in self.comments:
-            author = comment.user.login
-            # do not let the author sign off on their own PR
-            if author == except_login:
-                continue
-            # ignore any lgtm comments prior to the most recent commit (need to lgtm again)
-            if last_commit_date and comment.created_at < last_commit_date:
-                continue
-            if LGTM_ALIAS_RE.search(comment.body):
-                lgtm_logins.append(author)
-        return utils.ordered_set(lgtm_logins)
+        if self.signoff_source in ('comments', 'both'):
+            lgtm_logins.extend(self._comment_sign_offs(except_login))
+        if self.signoff_source in ('reviews', 'both'):
+            lgtm_logins.extend(self._review_verdicts(True))
+            changes_requested = set(self._review_verdicts(False))
+            lgtm_logins = [login for login in lgtm_logins if login not in changes_requested]
+        # do not let the author sign off on their own PR
+        return utils.ordered_set(login for login in lgtm_logins if login != except_login)
+
+    def _comment_sign_offs(self, except_login):
+        # ignore any lgtm comments prior to the most recent commit (need to lgtm again)
+        return self._git_hub.sign_off_detector.signed_off_by(
+            self.get_sign_off_comments(), since=self.last_commit_date, except_login=except_login)
+
+    def _review_verdicts(self, approved):
+        """
+        :param approved: True for the reviewers who approved, False for those who requested changes
+        :return: the GitHub user names whose latest review of the head commit has that verdict
+        """
+        state = 'APPROVED' if approved else 'CHANGES_REQUESTED'
+        for login, review in sorted(self.latest_reviews.items()):
+            # reviews of earlier commits are stale, like lgtm comments made before the last commit
+            if review.state == state and review.commit_id == self.head_sha:
+                yield login
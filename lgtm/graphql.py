@@ -0,0 +1,250 @@
+"""
+Optional GraphQL-backed loader for pull request state. A single query fetches the author, base
+branch, changed files, comments, commits and each reviewer's latest review; connections with more
+than one page of results are followed with cursor pagination only when they are iterated past the
+first page.
+
+The objects returned here implement the subset of PyGithub's PullRequest interface that
+lgtm.git.PullRequest uses, so they can be swapped in for the REST-backed objects.
+"""
+import json
+import urlparse
+
+from dateutil import parser as dateutil_parser
+from github import GithubException
+from github import UnknownObjectException
+
+import transport
+
+
+GITHUB_GRAPHQL_URL = 'https://api.github.com/graphql'
+
+# GitHub's maximum page size for GraphQL connections
+PAGE_SIZE = 100
+
+CONNECTION_FIELDS = {
+    'files': 'path',
+    'comments': 'id databaseId author { login } body createdAt',
+    'commits': 'commit { oid committedDate }',
+    # only the latest approving, changes requested or dismissed review of each reviewer
+    'latestOpinionatedReviews': 'author { login } state commit { oid } submittedAt',
+}
+
+
+def _connection_query(name, paginated=False):
+    return '%s(first: $pageSize%s) { pageInfo { hasNextPage endCursor } nodes { %s } }' % (
+        name, ', after: $cursor' if paginated else '', CONNECTION_FIELDS[name])
+
+
+PULL_REQUEST_QUERY = '''
+query($owner: String!, $name: String!, $number: Int!, $pageSize: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      id
+      author { login }
+      baseRefName
+      headRefName
+      headRefOid
+      %s
+    }
+  }
+}
+''' % '\n      '.join(_connection_query(name) for name in sorted(CONNECTION_FIELDS))
+
+PAGE_QUERY = '''
+query($owner: String!, $name: String!, $number: Int!, $pageSize: Int!, $cursor: String!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      %s
+    }
+  }
+}
+'''
+
+ADD_COMMENT_MUTATION = '''
+mutation($subjectId: ID!, $body: String!) {
+  addComment(input: {subjectId: $subjectId, body: $body}) {
+    commentEdge { node { %s } }
+  }
+}
+''' % CONNECTION_FIELDS['comments']
+
+UPDATE_COMMENT_MUTATION = '''
+mutation($id: ID!, $body: String!) {
+  updateIssueComment(input: {id: $id, body: $body}) {
+    issueComment { id }
+  }
+}
+'''
+
+
+def _parse_date(value):
+    # PyGithub returns naive UTC datetimes, match that
+    return dateutil_parser.parse(value).replace(tzinfo=None)
+
+
+class GraphQLClient(object):
+    """
+    Minimal client for the GitHub GraphQL API
+    """
+
+    def __init__(self, github_token, url=GITHUB_GRAPHQL_URL, timeout=None):
+        self.github_token = github_token
+        self.url = url
+        self.timeout = timeout
+
+    def _connect(self):
+        url = urlparse.urlparse(self.url)
+        connection_class = transport.get_connection_class(url.scheme)
+        return connection_class(url.hostname, url.port, timeout=self.timeout), url.path
+
+    def query(self, query, variables=None):
+        """
+        Run a GraphQL query or mutation
+        :param query: the GraphQL document
+        :param variables: dict of variables referenced by the document
+        :return: the 'data' portion of the response
+        """
+        connection, path = self._connect()
+        body = json.dumps({'query': query, 'variables': variables or {}})
+        headers = {
+            'Authorization': 'bearer %s' % self.github_token,
+            'Content-Type': 'application/json',
+            'User-Agent': 'lgtm',
+        }
+        try:
+            connection.request('POST', path, body, headers)
+            response = connection.getresponse()
+            status, output = response.status, response.read()
+        finally:
+            connection.close()
+        data = json.loads(output) if output else {}
+        if status >= 400:
+            raise GithubException(status, data)
+        errors = data.get('errors')
+        if errors:
+            if any(error.get('type') == 'NOT_FOUND' for error in errors):
+                raise UnknownObjectException(404, data)
+            raise GithubException(status, data)
+        return data['data']
+
+
+class _User(object):
+
+    def __init__(self, login):
+        self.login = login
+
+
+class _Ref(object):
+
+    def __init__(self, ref, sha=None):
+        self.ref = ref
+        self.sha = sha
+
+
+class _File(object):
+
+    def __init__(self, node):
+        self.filename = node['path']
+
+
+class _GitAuthor(object):
+
+    def __init__(self, date):
+        self.date = date
+
+
+class _GitCommit(object):
+
+    def __init__(self, node):
+        self.sha = node['oid']
+        self.last_modified = node['committedDate']
+        self.committer = _GitAuthor(_parse_date(node['committedDate']))
+        self.raw_headers = {}
+
+
+class _Commit(object):
+
+    def __init__(self, node):
+        self.commit = _GitCommit(node['commit'])
+        self.sha = self.commit.sha
+
+
+class _Review(object):
+
+    def __init__(self, node):
+        self.user = _User((node.get('author') or {}).get('login')) if node.get('author') else None
+        self.state = node['state']
+        self.commit_id = (node.get('commit') or {}).get('oid')
+        self.submitted_at = _parse_date(node['submittedAt']) if node.get('submittedAt') else None
+
+
+class IssueComment(object):
+
+    def __init__(self, client, node):
+        self._client = client
+        self.node_id = node['id']
+        self.id = node['databaseId']
+        self.user = _User((node.get('author') or {}).get('login'))
+        self.body = node['body']
+        self.created_at = _parse_date(node['createdAt'])
+
+    def edit(self, body):
+        self._client.query(UPDATE_COMMENT_MUTATION, {'id': self.node_id, 'body': body})
+        self.body = body
+
+
+class PullRequest(object):
+    """
+    A pull request loaded with one GraphQL query
+    """
+
+    def __init__(self, client, org_name, repo_name, pr_number, page_size=PAGE_SIZE):
+        self._client = client
+        self._variables = dict(owner=org_name, name=repo_name, number=pr_number, pageSize=page_size)
+        data = client.query(PULL_REQUEST_QUERY, self._variables)
+        pull_request = (data.get('repository') or {}).get('pullRequest')
+        if not pull_request:
+            raise UnknownObjectException(404, data)
+        self.node_id = pull_request['id']
+        self.number = pr_number
+        self.user = _User((pull_request.get('author') or {}).get('login'))
+        self.base = _Ref(pull_request['baseRefName'])
+        self.head = _Ref(pull_request['headRefName'], pull_request['headRefOid'])
+        self._nodes = {}
+        self._page_info = {}
+        for name in CONNECTION_FIELDS:
+            self._nodes[name] = list(pull_request[name]['nodes'])
+            self._page_info[name] = pull_request[name]['pageInfo']
+
+    def _iter_nodes(self, name):
+        # pages are kept once fetched, so iterating again does not repeat requests
+        nodes, index = self._nodes[name], 0
+        while True:
+            while index < len(nodes):
+                yield nodes[index]
+                index += 1
+            page_info = self._page_info[name]
+            if not page_info['hasNextPage']:
+                return
+            variables = dict(self._variables, cursor=page_info['endCursor'])
+            data = self._client.query(PAGE_QUERY % _connection_query(name, paginated=True), variables)
+            connection = data['repository']['pullRequest'][name]
+            nodes.extend(connection['nodes'])
+            self._page_info[name] = connection['pageInfo']
+
+    def get_files(self):
+        return (_File(node) for node in self._iter_nodes('files'))
+
+    def get_issue_comments(self):
+        return [IssueComment(self._client, node) for node in self._iter_nodes('comments')]
+
+    def get_commits(self):
+        return [_Commit(node) for node in self._iter_nodes('commits')]
+
+    def get_reviews(self):
+        return [_Review(node) for node in self._iter_nodes('latestOpinionatedReviews')]
+
+    def create_issue_comment(self, body):
+        data = self._client.query(ADD_COMMENT_MUTATION, {'subjectId': self.node_id, 'body': body})
+        return IssueComment(self._client, data['addComment']['commentEdge']['node'])
@@ -26,12 +26,18 @@ def parse_git_branch(git_branch):
     return _match(r'[^/]+/pr/(?P<github_pr_number>\d+)', git_branch)
 
 
+def parse_target_branch(target_branch):
+    # ex: master
+    return {'base_ref': target_branch}
+
+
 def get_pull_request_dict(env):
     pull_request_dict = {}
     for env_var_name, parser in (
         ('ghprbPullLink', parse_pull_link),
         ('GIT_URL', parse_git_url),
         ('GIT_BRANCH', parse_git_branch),
+        ('ghprbTargetBranch', parse_target_branch),
     ):
         env_var_value = env.get(env_var_name)
         if env_var_value:
@@ -18,11 +18,17 @@ def parse_pull_request(value):
     return {'github_pr_number': int(value)}
 
 
+def parse_branch(value):
+    # for a pull request build, the branch it merges into, ex: master
+    return {'base_ref': value}
+
+
 def get_pull_request_dict(env):
     pull_request_dict = {}
     for env_var_name, parser in (
         ('TRAVIS_REPO_SLUG', parse_repo_slug),
         ('TRAVIS_PULL_REQUEST', parse_pull_request),
+        ('TRAVIS_BRANCH', parse_branch),
     ):
         env_var_value = env.get(env_var_name)
         if env_var_value:
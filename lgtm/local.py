@@ -0,0 +1,115 @@
+"""
+Reads OWNERS files and the changed files of a pull request from a local git checkout, like the one
+a CI job builds, instead of from the GitHub API. The API is then only needed for the pull request
+itself, its comments and reviews, team memberships and the review request comment.
+
+OWNERS files are read from the base branch, like the API reads them from the default branch, so a
+pull request can't change who has to review it.
+"""
+import subprocess
+
+import owners
+import stats
+
+
+class LocalCheckoutError(Exception):
+    pass
+
+
+class LocalCheckout(object):
+    """
+    Stands in for git.GitHub when reading OWNERS files, see get_owners_matcher() and get_owners_tree()
+    """
+
+    def __init__(self, path, base_ref, head_ref='HEAD'):
+        """
+        :param path: the directory of the git checkout
+        :param base_ref: the branch the pull request merges into, like 'master'. When it is not a
+            local branch, the remote tracking branch origin/<base_ref> is used.
+        :param head_ref: the pull request commit, the checked out commit by default
+        """
+        self.path = path
+        self.base = self.resolve(base_ref)
+        self.head = self.resolve(head_ref)
+        self._owners_matchers = {}
+
+    def _git(self, *args):
+        process = subprocess.Popen(('git',) + args, cwd=self.path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        if process.returncode:
+            raise LocalCheckoutError('git %s failed: %s' % (' '.join(args), stderr.strip()))
+        return stdout
+
+    def resolve(self, ref):
+        """
+        :return: the commit SHA of ref
+        """
+        for candidate in (ref, 'origin/%s' % ref):
+            try:
+                return self._git('rev-parse', '--verify', '--quiet', '%s^{commit}' % candidate).strip()
+            except LocalCheckoutError:
+                continue
+        raise LocalCheckoutError('Unknown git ref %s in %s' % (ref, self.path))
+
+    @stats.timed('LocalCheckout.changed_files')
+    def changed_files(self):
+        """
+        The files changed since the head commit branched off the base branch, like the files of the
+        pull request on GitHub
+        :return: a list of file paths
+        """
+        output = self._git('diff', '--name-only', '--no-renames', '-z', '%s...%s' % (self.base, self.head))
+        return [path for path in output.split('\0') if path]
+
+    def _list_blobs(self, *paths):
+        """
+        :return: a list of (path, blob SHA) tuples on the base branch
+        """
+        output = self._git('ls-tree', '-r', '-z', self.base, '--', *paths)
+        blobs = []
+        for entry in output.split('\0'):
+            if not entry:
+                continue
+            info, path = entry.split('\t', 1)
+            mode, object_type, sha = info.split(' ')
+            if object_type == 'blob':
+                blobs.append((path, sha))
+        return blobs
+
+    def _get_owners_matcher_by_sha(self, sha):
+        matcher = self._owners_matchers.get(sha)
+        if matcher is None:
+            matcher = owners.compile_owners_file(self._git('cat-file', 'blob', sha).split('\n'))
+            self._owners_matchers[sha] = matcher
+        return matcher
+
+    def read_file_lines(self, file_path='OWNERS'):
+        """
+        :param file_path: A relative path to the file
+        :return: a list of line strings of the file on the base branch, empty if there is no such file
+        """
+        for path, sha in self._list_blobs(file_path):
+            return self._git('cat-file', 'blob', sha).split('\n')
+        return []
+
+    @stats.timed('LocalCheckout.get_owners_matcher')
+    def get_owners_matcher(self, file_path='OWNERS'):
+        """
+        :param file_path: A relative path to the file
+        :return: an owners.OwnersMatcher of the file on the base branch
+        """
+        for path, sha in self._list_blobs(file_path):
+            return self._get_owners_matcher_by_sha(sha)
+        return owners.compile_matcher([])
+
+    @stats.timed('LocalCheckout.get_owners_tree')
+    def get_owners_tree(self, file_name='OWNERS'):
+        """
+        :param file_name: The name of the OWNERS files, like 'OWNERS'
+        :return: an owners.OwnersTree of the OWNERS files of every directory on the base branch
+        """
+        matchers = {}
+        for path, sha in self._list_blobs():
+            if path.rsplit('/', 1)[-1] == file_name:
+                matchers[path[:-len(file_name)].rstrip('/')] = self._get_owners_matcher_by_sha(sha)
+        return owners.OwnersTree(matchers)
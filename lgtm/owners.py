@@ -13,19 +13,38 @@ directive := "set noparent"
 glob      := [a-zA-Z0-9_-*?]+
 comment   := "#" [^"\n"]*
 """
+import collections
 import fnmatch
 import logging
+import os
+import re
+import stats
 import utils
 
 
 logger = logging.getLogger(__name__)
 
+# bump when OwnersMatcher's attributes change, so matchers pickled by older versions are not loaded
+MATCHER_FORMAT_VERSION = 3
 
+NOPARENT_DIRECTIVE = 'set noparent'
+PER_FILE_DIRECTIVE = 'per-file '
+
+# characters that end the literal part of a glob; everything before/after them must match exactly
+GLOB_SPECIAL_CHARS = '*?[]'
+PATH_SEPARATOR = os.path.normcase('/')
+
+
+# one line of an OWNERS file, glob is None for an owner of every file
+Rule = collections.namedtuple('Rule', ['owner', 'glob'])
+
+
+@stats.timed('owners.parse')
 def parse(owners_lines):
     """
     takes a list of lines from a OWNERS text file and returns a list of
     :param owners_lines: a list of strings, one for each line of a OWNERS file
-    :return: list of (ID, glob) tuples, where glob can be None
+    :return: list of Rule(owner, glob) tuples, where glob can be None
     """
     results = []
     for owner_line in owners_lines:
@@ -37,33 +56,271 @@ def parse(owners_lines):
             continue
         if owner_line.startswith('#'):
             continue
-        if ' ' in owner_line:
-            result = tuple(owner_line.split(' ', 1))
+        if owner_line == NOPARENT_DIRECTIVE:
+            continue
+        if owner_line.startswith(PER_FILE_DIRECTIVE):
+            glob, _, owner = owner_line[len(PER_FILE_DIRECTIVE):].partition('=')
+            owner, glob = owner.strip().lstrip('@'), glob.strip()
+        elif ' ' in owner_line:
+            owner, glob = owner_line.split(' ', 1)
         else:
-            result = (owner_line, None)
-        results.append(result)
+            owner, glob = owner_line, None
+        results.append(Rule(utils.intern_login(owner), glob))
     return results
 
 
+def _literal_prefix(glob):
+    for index, char in enumerate(glob):
+        if char in GLOB_SPECIAL_CHARS:
+            return glob[:index]
+    return glob
+
+
+def _literal_suffix(glob):
+    for index in range(len(glob) - 1, -1, -1):
+        if glob[index] in GLOB_SPECIAL_CHARS:
+            return glob[index + 1:]
+    return glob
+
+
+def _literal_runs(glob):
+    """
+    :return: the runs of glob that match themselves, outside wildcards and bracket expressions like '[a/b]'
+    """
+    runs = []
+    start = index = 0
+    while index < len(glob):
+        char = glob[index]
+        if char not in GLOB_SPECIAL_CHARS:
+            index += 1
+            continue
+        runs.append(glob[start:index])
+        index += 1
+        if char == '[':
+            # find the end of the bracket expression the way fnmatch.translate() does
+            end = index
+            if end < len(glob) and glob[end] == '!':
+                end += 1
+            if end < len(glob) and glob[end] == ']':
+                end += 1
+            while end < len(glob) and glob[end] != ']':
+                end += 1
+            if end < len(glob):
+                index = end + 1
+        start = index
+    runs.append(glob[start:])
+    return runs
+
+
+def _literal_directory(glob):
+    # a literal run like '/subdir/' means the file must have 'subdir' as a full directory name
+    for run in _literal_runs(glob):
+        directories = run.split(PATH_SEPARATOR)[1:-1]
+        if directories:
+            return max(directories, key=len)
+    return None
+
+
+class _Trie(object):
+    """
+    Character trie from literal strings to the glob indexes that were added under them. Walking a
+    file name through the trie yields every index whose key is a prefix of that name.
+    """
+
+    def __init__(self):
+        self._root = {}
+
+    def add(self, key, value):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(value)
+
+    def iter_prefix_values(self, text):
+        node = self._root
+        for value in node.get(None, ()):
+            yield value
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                return
+            for value in node.get(None, ()):
+                yield value
+
+
+class OwnersMatcher(object):
+    """
+    An OWNERS rule set compiled for matching many files at once. Globs are bucketed by their
+    literal prefix (ex: a directory) or, when they start with a wildcard, by their literal suffix
+    (ex: a file extension), so each file is only tested against the globs that could match it.
+    Globs with neither, like '*/subdir/*', are bucketed by a directory name they require. Matching is
+    identical to running fnmatch.filter() once per rule. Matchers can be pickled, to skip parsing
+    and bucketing when the same OWNERS file is seen again.
+    """
+
+    def __init__(self, owner_glob_tuple_list, noparent=False):
+        """
+        :param noparent: whether the OWNERS file has 'set noparent', see OwnersTree
+        """
+        self.rules = list(owner_glob_tuple_list)
+        self.noparent = noparent
+        self._patterns = {}
+        self._prefixes = _Trie()
+        self._suffixes = _Trie()
+        self._directories = {}
+        self._unanchored = []
+        for index, (owner, glob) in enumerate(self.rules):
+            if not glob:
+                continue
+            glob = os.path.normcase(glob)
+            self._patterns[index] = fnmatch.translate(glob)
+            prefix = _literal_prefix(glob)
+            suffix = _literal_suffix(glob)
+            directory = _literal_directory(glob)
+            if prefix:
+                self._prefixes.add(prefix, index)
+            elif suffix:
+                self._suffixes.add(suffix[::-1], index)
+            elif directory:
+                self._directories.setdefault(directory, []).append(index)
+            else:
+                self._unanchored.append(index)
+        self._compile()
+
+    def _compile(self):
+        self._glob_matchers = dict((index, re.compile(pattern).match) for index, pattern in self._patterns.items())
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_glob_matchers']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def _candidates(self, filename):
+        for index in self._prefixes.iter_prefix_values(filename):
+            yield index
+        for index in self._suffixes.iter_prefix_values(filename[::-1]):
+            yield index
+        if self._directories:
+            for directory in filename.split(PATH_SEPARATOR)[:-1]:
+                for index in self._directories.get(directory, ()):
+                    yield index
+        for index in self._unanchored:
+            yield index
+
+    def match_files(self, files):
+        """
+        Find the glob rules that match at least one of the files. Files are read lazily and
+        reading stops once every glob rule has matched, since later files cannot change the result.
+        :param files: an iterable of file paths, like a generator over pages of an API
+        :return: a dict of rule index to the first file path that matched it
+        """
+        matched = {}
+        if not self._glob_matchers:
+            return matched
+        for filename in files:
+            normalized = os.path.normcase(filename)
+            for index in self._candidates(normalized):
+                if index not in matched and self._glob_matchers[index](normalized):
+                    matched[index] = filename
+            if len(matched) == len(self._glob_matchers):
+                break
+        return matched
+
+    @stats.timed('OwnersMatcher.get_owners_of_files')
+    def get_owners_of_files(self, files):
+        """
+        See get_owners_of_files()
+        """
+        matched = self.match_files(files)
+        reviewers, required = list(), list()
+        for index, (owner, glob) in enumerate(self.rules):
+            if not glob:
+                logger.debug('%s matches anything' % owner)
+                reviewers.append(owner)
+            elif index in matched:
+                logger.debug('%s matches %r' % (owner, matched[index]))
+                reviewers.append(owner)
+                required.append(owner)
+        return utils.ordered_set(reviewers), utils.ordered_set(required)
+
+
+class OwnersTree(object):
+    """
+    The OWNERS files of every directory in a repository. The rules of a directory's OWNERS file
+    apply to the files below it, with globs relative to that directory. The rules of the parent
+    directories apply as well, unless the file has 'set noparent'. Each changed file is looked up
+    once per level of its depth, then every OWNERS file is matched against only the files below it.
+    """
+
+    def __init__(self, matchers):
+        """
+        :param matchers: dict of directory path, '' for the root, to the OwnersMatcher of its file
+        """
+        self.matchers = matchers
+
+    def _iter_owning_directories(self, filename):
+        directory = filename
+        while directory:
+            index = directory.rfind('/')
+            directory = directory[:index] if index >= 0 else ''
+            matcher = self.matchers.get(directory)
+            if matcher is not None:
+                yield directory
+                if matcher.noparent:
+                    return
+
+    @stats.timed('OwnersTree.get_owners_of_files')
+    def get_owners_of_files(self, files):
+        """
+        See get_owners_of_files(). Reviewers are ordered by directory, parents first, then by
+        rule order within each OWNERS file.
+        """
+        files_by_directory = {}
+        for filename in files:
+            for directory in self._iter_owning_directories(filename):
+                relative = filename[len(directory) + 1:] if directory else filename
+                files_by_directory.setdefault(directory, []).append(relative)
+        reviewers, required = list(), list()
+        for directory in sorted(files_by_directory):
+            directory_reviewers, directory_required = self.matchers[directory].get_owners_of_files(
+                files_by_directory[directory])
+            reviewers.extend(directory_reviewers)
+            required.extend(directory_required)
+        return utils.ordered_set(reviewers), utils.ordered_set(required)
+
+
+@stats.timed('owners.compile_owners_file')
+def compile_owners_file(owners_lines):
+    """
+    Parse and compile the lines of one OWNERS file
+    :param owners_lines: a list of strings, one for each line of a OWNERS file
+    :return: an OwnersMatcher
+    """
+    noparent = any(line.strip() == NOPARENT_DIRECTIVE for line in owners_lines)
+    return OwnersMatcher(parse(owners_lines), noparent=noparent)
+
+
+@stats.timed('owners.compile_matcher')
+def compile_matcher(owner_glob_tuple_list):
+    """
+    Build a matcher once from parse() output, for evaluating one or more lists of files
+    :param owner_glob_tuple_list: a list of (ID, glob) tuples from OWNERS
+    :return: an OwnersMatcher
+    """
+    return OwnersMatcher(owner_glob_tuple_list)
+
+
 def get_owners_of_files(owner_glob_tuple_list, files):
     """
     Given a list of (ID, glob) tuples and a list of files, return the set of IDs of reviewers
     :param owner_glob_tuple_list: a list of (ID, glob) tuples from OWNERS
-    :param files: a list of files changed by the pull request
+    :param files: an iterable of files changed by the pull request, read only as far as needed
     :return: the list of IDs of reviewers who should review the PR, and a list of IDs that MUST
         sign off on a PR before it can be merged
     """
-    # no ordered set in Python, use ordered dict w/ throw-away key
     # preserve order of input b/c we want to assign PR to first owner
-    reviewers, required = list(), list()
-    for owner, glob in owner_glob_tuple_list:
-        if glob:
-            matched_files = fnmatch.filter(files, glob)
-            if matched_files:
-                logger.debug('%s matches %r' % (owner, matched_files))
-                reviewers.append(owner)
-                required.append(owner)
-        else:
-            logger.debug('%s matches anything' % owner)
-            reviewers.append(owner)
-    return utils.ordered_set(reviewers), utils.ordered_set(required)
+    return compile_matcher(owner_glob_tuple_list).get_owners_of_files(files)
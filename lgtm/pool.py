@@ -0,0 +1,69 @@
+"""
+A small bounded thread pool. Evaluating a pull request is nearly all waiting on the GitHub API, so
+running several on threads overlaps that waiting. lgtm supports Python 2, which has neither
+asyncio nor concurrent.futures.
+"""
+import collections
+import Queue
+import sys
+import threading
+
+
+DEFAULT_MAX_WORKERS = 8
+
+Result = collections.namedtuple('Result', ['item', 'value', 'exc_info'])
+
+
+def _run(func, item, results):
+    try:
+        results.put(Result(item, func(item), None))
+    except Exception:
+        results.put(Result(item, None, sys.exc_info()))
+
+
+def imap_unordered(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Call func on every item, at most max_workers at a time. Items are read lazily, so items can be a
+    generator over a stream.
+    :param func: a callable taking one item
+    :param items: an iterable of items
+    :param max_workers: maximum number of calls in progress at once
+    :return: a generator of Result(item, value, exc_info) tuples, in the order the calls finish;
+        exc_info is the sys.exc_info() of a call that raised, otherwise None
+    """
+    max_workers = max(1, max_workers)
+    results = Queue.Queue()
+    items = iter(items)
+    in_flight = 0
+    exhausted = False
+    while True:
+        while not exhausted and in_flight < max_workers:
+            try:
+                item = next(items)
+            except StopIteration:
+                exhausted = True
+                break
+            thread = threading.Thread(target=_run, args=(func, item, results))
+            thread.daemon = True
+            thread.start()
+            in_flight += 1
+        if not in_flight:
+            return
+        yield results.get()
+        in_flight -= 1
+
+
+def imap(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Like imap_unordered(), but results come in the order of items. A slow call holds back the
+    results after it, while the calls after it keep running.
+    :return: a generator of Result(item, value, exc_info) tuples, in the order of items
+    """
+    finished = {}
+    next_index = 0
+    for result in imap_unordered(lambda indexed: func(indexed[1]), enumerate(items), max_workers=max_workers):
+        index, item = result.item
+        finished[index] = Result(item, result.value, result.exc_info)
+        while next_index in finished:
+            yield finished.pop(next_index)
+            next_index += 1
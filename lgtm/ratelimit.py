@@ -0,0 +1,159 @@
+"""
+Client side pacing for the GitHub API. Tracks the X-RateLimit-Remaining/Reset headers GitHub sends
+with every response, paces requests with a token bucket, and backs off with jitter when GitHub
+answers 403 or 429 because of a primary or secondary rate limit. When many CI jobs share a token,
+this turns a wall of failed builds into slower ones.
+"""
+import logging
+import random
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_STATUSES = (403, 429)
+
+# once less than this fraction of the hourly quota is left, spread the rest until the reset time
+LOW_QUOTA_FRACTION = 0.1
+
+# seconds to wait for the GitHub API before giving up, the hourly quota can take up to an hour to reset
+DEFAULT_MAX_WAIT = 600
+
+
+class RateLimitWaitError(Exception):
+    pass
+
+
+class TokenBucket(object):
+    """
+    Allows bursts of up to capacity requests, refilled at rate requests per second
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.time):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def reserve(self):
+        """
+        Take a token, going into debt if none are left
+        :return: seconds to wait before using the token
+        """
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0
+        return -self._tokens / self.rate
+
+
+class RequestScheduler(object):
+    """
+    Decides how long to wait before each request, and whether and when to retry a rate limited one.
+    Shared by every thread in the process.
+    """
+
+    def __init__(self, max_requests_per_second=None, max_retries=5, base_delay=1.0, max_delay=60.0,
+                 max_wait=DEFAULT_MAX_WAIT, clock=time.time, sleep=time.sleep, random_uniform=random.uniform):
+        """
+        :param max_wait: longest wait in seconds, like for the quota to reset, before raising a
+            RateLimitWaitError instead. None to wait as long as it takes.
+        """
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._uniform = random_uniform
+        self._lock = threading.Lock()
+        self._bucket = None
+        self._quota_bucket = None
+        self.set_rate(max_requests_per_second)
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.total_wait = 0.0
+
+    def set_rate(self, max_requests_per_second):
+        """
+        :param max_requests_per_second: steady request rate, or None to only pace on a low quota
+        """
+        with self._lock:
+            self._bucket = TokenBucket(max_requests_per_second, clock=self._clock) \
+                if max_requests_per_second else None
+
+    def wait(self, seconds, reason):
+        if seconds <= 0:
+            return
+        if self.max_wait is not None and seconds > self.max_wait:
+            raise RateLimitWaitError('The GitHub API is %s, waiting %.0fs is longer than the maximum of %.0fs' % (
+                reason, seconds, self.max_wait))
+        logger.info('Waiting %.1fs for the GitHub API: %s' % (seconds, reason))
+        with self._lock:
+            self.total_wait += seconds
+        self._sleep(seconds)
+
+    def before_request(self):
+        """
+        Block until the next request may be sent
+        """
+        with self._lock:
+            now = self._clock()
+            if self.reset_at is None or now >= self.reset_at:
+                self.remaining = None
+            if self.remaining is not None and self.remaining <= 0:
+                delay, reason = self.reset_at - now + self._uniform(0, 1), 'quota exhausted until reset'
+            else:
+                delays = [0]
+                if self._bucket:
+                    delays.append(self._bucket.reserve())
+                if self.remaining is not None and self.remaining < (self.limit or 0) * LOW_QUOTA_FRACTION:
+                    quota_rate = float(self.remaining) / max(1, self.reset_at - now)
+                    if self._quota_bucket is None:
+                        self._quota_bucket = TokenBucket(quota_rate, capacity=1, clock=self._clock)
+                    self._quota_bucket.rate = quota_rate
+                    delays.append(self._quota_bucket.reserve())
+                else:
+                    self._quota_bucket = None
+                if self.remaining is not None:
+                    self.remaining -= 1
+                delay, reason = max(delays), 'pacing requests'
+        self.wait(delay, reason)
+
+    def update(self, headers):
+        """
+        :param headers: response headers, with lower case names
+        """
+        with self._lock:
+            if 'x-ratelimit-limit' in headers:
+                self.limit = int(headers['x-ratelimit-limit'])
+            if 'x-ratelimit-remaining' in headers:
+                self.remaining = int(headers['x-ratelimit-remaining'])
+            if 'x-ratelimit-reset' in headers:
+                self.reset_at = float(headers['x-ratelimit-reset'])
+
+    def retry_delay(self, status, headers, body, attempt):
+        """
+        :param status: HTTP status of the response
+        :param headers: response headers, with lower case names
+        :param body: response body
+        :param attempt: how many times this request has been retried already
+        :return: seconds to wait before retrying, or None if the response should be returned as is
+        """
+        if status not in RATE_LIMIT_STATUSES or attempt >= self.max_retries:
+            return None
+        jitter = self._uniform(0, 1)
+        if headers.get('retry-after'):
+            return float(headers['retry-after']) + jitter
+        if headers.get('x-ratelimit-remaining') == '0' and headers.get('x-ratelimit-reset'):
+            return max(0, float(headers['x-ratelimit-reset']) - self._clock()) + jitter
+        if status == 429 or 'rate limit' in (body or '').lower():
+            # full jitter exponential backoff
+            return self._uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        # a 403 for any other reason, like missing permissions
+        return None
@@ -0,0 +1,78 @@
+"""
+Memoizes the verdict of an evaluation between runs. Most builds re-run lgtm on a pull request
+where nothing that matters changed, like a new comment that does not sign off. The verdict is
+stored under a hash of everything it was computed from: the OWNERS rules, the changed files, the
+head commit, the sign-off comments and reviews, and the options. The memberships of the teams the
+verdict depended on are stored with it, and checked again before it is reused.
+
+A reused verdict skips assigning the pull request, the review request comment, the commit list
+and checking the sign-offs.
+"""
+import hashlib
+import json
+
+
+# bump to ignore results stored by older versions
+RESULT_FORMAT_VERSION = 1
+
+# options that change the verdict, besides what is read from GitHub
+RESULT_OPTIONS = ('skip_approval_branches', 'skip_assignment', 'skip_notification_branches', 'signoff_source',
+                  'lgtm_aliases')
+
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True)).hexdigest()
+
+
+def owners_fingerprint(owners_matcher):
+    """
+    :param owners_matcher: an owners.OwnersMatcher or owners.OwnersTree
+    :return: a hash of the rules
+    """
+    matchers = getattr(owners_matcher, 'matchers', {'': owners_matcher})
+    return _hash(sorted((directory, matcher.rules, matcher.noparent) for directory, matcher in matchers.items()))
+
+
+def make_key(owners_matcher, files, pull_request, options):
+    """
+    :param files: the list of changed files
+    :param pull_request: a git.PullRequest
+    :return: the key to store the verdict under
+    """
+    return _hash([
+        RESULT_FORMAT_VERSION,
+        owners_fingerprint(owners_matcher),
+        sorted(files),
+        pull_request.head_sha,
+        pull_request.base_branch,
+        pull_request.author,
+        pull_request.sign_off_state(),
+        [options.get(option) for option in RESULT_OPTIONS],
+    ])
+
+
+def _team_versions(github_repo, team_names):
+    members = github_repo.get_members_of_teams(team_names)
+    return dict((team_name, _hash(sorted(logins))) for team_name, logins in zip(team_names, members))
+
+
+def get_verdict(github_repo, key):
+    """
+    :param github_repo: a git.GitHub with a result_cache
+    :return: the stored verdict, or None if there is none or a team it depended on has changed
+    """
+    result = github_repo.result_cache.get(key)
+    if result is None:
+        return None
+    if _team_versions(github_repo, sorted(result['teams'])) != result['teams']:
+        return None
+    return result['ready']
+
+
+def set_verdict(github_repo, key, team_names, ready):
+    """
+    :param team_names: the teams that the verdict depended on, like 'OrgName/team1'
+    :param ready: the verdict
+    """
+    team_names = sorted(name for name in team_names if '/' in name)
+    github_repo.result_cache.set(key, {'teams': _team_versions(github_repo, team_names), 'ready': ready})
@@ -0,0 +1,179 @@
+"""
+Long running webhook server, started with `lgtm serve`. GitHub posts pull_request, issue_comment and
+pull_request_review events; each one queues an evaluation of the pull request, and the result is
+published as a commit status on its head commit.
+
+GitHub helpers, with their organization, repository and team membership caches, are kept for the
+life of the server instead of being rebuilt for every build.
+"""
+import BaseHTTPServer
+import hashlib
+import hmac
+import json
+import logging
+import Queue
+import SocketServer
+import threading
+
+from lgtm import evaluate_pull_request
+from lgtm import get_github
+from lgtm import git
+
+
+logger = logging.getLogger(__name__)
+
+# event name -> actions that can change whether a pull request is ready to merge
+HANDLED_EVENTS = {
+    'pull_request': ('opened', 'reopened', 'synchronize', 'edited', 'ready_for_review'),
+    'issue_comment': ('created', 'edited', 'deleted'),
+    'pull_request_review': ('submitted', 'edited', 'dismissed'),
+}
+
+# seconds to keep team memberships in memory between evaluations
+DEFAULT_TEAM_MAX_AGE = 300
+
+
+def parse_event(event, payload):
+    """
+    Find the pull request that a webhook event is about
+    :param event: the X-GitHub-Event header
+    :param payload: the decoded JSON body
+    :return: (org, repo, pr_number), or None if the event can't change a pull request's status
+    """
+    if payload.get('action') not in HANDLED_EVENTS.get(event, ()):
+        return None
+    if event == 'issue_comment':
+        issue = payload.get('issue') or {}
+        if 'pull_request' not in issue:
+            return None
+        pr_number = issue['number']
+    else:
+        pr_number = payload['pull_request']['number']
+    repository = payload['repository']
+    return repository['owner']['login'], repository['name'], pr_number
+
+
+def verify_signature(secret, body, headers):
+    """
+    Check the HMAC signature GitHub sends when the webhook has a secret
+    :param headers: the request headers, with lower case names
+    :return: True if the signature matches
+    """
+    for header, prefix, algorithm in (('x-hub-signature-256', 'sha256', hashlib.sha256),
+                                      ('x-hub-signature', 'sha1', hashlib.sha1)):
+        signature = headers.get(header)
+        if signature:
+            expected = '%s=%s' % (prefix, hmac.new(secret, body, algorithm).hexdigest())
+            return hmac.compare_digest(expected, signature)
+    return False
+
+
+class WebhookHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def _respond(self, status, message):
+        body = json.dumps({'message': message})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        headers = dict((k.lower(), v) for k, v in self.headers.items())
+        if self.server.secret and not verify_signature(self.server.secret, body, headers):
+            return self._respond(401, 'Bad signature')
+        event = headers.get('x-github-event')
+        if event == 'ping':
+            return self._respond(200, 'pong')
+        try:
+            pull_request_ref = parse_event(event, json.loads(body))
+        except (ValueError, KeyError, TypeError):
+            return self._respond(400, 'Bad payload')
+        if not pull_request_ref:
+            return self._respond(202, 'Ignored')
+        self.server.submit(*pull_request_ref)
+        return self._respond(202, 'Queued')
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class WebhookServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Receives webhooks on any number of threads, and evaluates pull requests one at a time on a
+    worker thread. Events for a pull request that is already waiting to be evaluated are merged.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, github_token, owners_file='OWNERS', options=None, secret=None,
+                 status_context='lgtm'):
+        BaseHTTPServer.HTTPServer.__init__(self, address, WebhookHandler)
+        self.github_token = github_token
+        self.owners_file = owners_file
+        self.options = options or {}
+        self.secret = secret
+        self.status_context = status_context
+        self.team_resolver = git.TeamResolver(max_age=self.options.get('team_cache_ttl') or DEFAULT_TEAM_MAX_AGE)
+        self._github_repos = {}
+        self._queue = Queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._work)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def submit(self, org, repo, pr_number):
+        key = (org, repo, pr_number)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._queue.put(key)
+
+    def wait(self):
+        """
+        Block until every queued evaluation has finished
+        """
+        self._queue.join()
+
+    def get_github(self, org, repo):
+        key = (org, repo)
+        if key not in self._github_repos:
+            self._github_repos[key] = get_github(
+                self.github_token, org, repo, options=self.options, team_resolver=self.team_resolver)
+        return self._github_repos[key]
+
+    def evaluate(self, org, repo, pr_number):
+        """
+        Evaluate a pull request and publish the result as a commit status
+        :return: A boolean that represents whether the pull request can be merged.
+        """
+        github_repo = self.get_github(org, repo)
+        pull_request = github_repo.get_pull_request(
+            pr_number, accurate_commit_dates=self.options.get('accurate_commit_dates', False),
+            signoff_source=self.options.get('signoff_source', 'comments'))
+        try:
+            ready = evaluate_pull_request(github_repo, pull_request, owners_file=self.owners_file,
+                                          options=self.options)
+        except Exception:
+            pull_request.set_status('error', 'Could not check reviews', context=self.status_context)
+            raise
+        if ready:
+            pull_request.set_status('success', 'Ready to merge', context=self.status_context)
+        else:
+            pull_request.set_status('pending', 'Waiting for reviewers to sign off', context=self.status_context)
+        logger.info('%s/%s#%s is %sready to merge' % (org, repo, pr_number, '' if ready else 'NOT '))
+        return ready
+
+    def _work(self):
+        while True:
+            key = self._queue.get()
+            with self._lock:
+                self._pending.discard(key)
+            try:
+                self.evaluate(*key)
+            except Exception:
+                logger.exception('Failed to evaluate %s/%s#%s' % key)
+            finally:
+                self._queue.task_done()
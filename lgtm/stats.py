@@ -0,0 +1,155 @@
+"""
+Instrumentation for telling apart time spent waiting on GitHub from time spent matching. Phases
+are timed by wrapping functions with timed(), and HTTP requests are recorded by the transport.
+Everything is collected in the process wide `collector`, which lgtm prints with --verbose and
+writes with --stats-json.
+
+When the opentelemetry package is installed, every phase is also a span on the globally
+configured tracer provider. Without a configured provider, or without the package, spans cost
+nothing and nothing is exported.
+"""
+import functools
+import threading
+import time
+import urlparse
+
+
+_tracer = {}
+
+
+def _get_tracer():
+    if 'tracer' not in _tracer:
+        try:
+            from opentelemetry import trace
+            _tracer['tracer'] = trace.get_tracer('lgtm')
+        except ImportError:
+            _tracer['tracer'] = None
+    return _tracer['tracer']
+
+
+class Stats(object):
+    """
+    Wall time per phase, and HTTP request counts, bytes, pagination depth and connection reuse
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.phases = {}
+            self.requests = 0
+            self.request_seconds = 0.0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.paginated_requests = 0
+            self.max_page = 0
+            self.statuses = {}
+            self.connections_opened = 0
+            self.connections_reused = 0
+
+    def record_phase(self, name, seconds):
+        with self._lock:
+            phase = self.phases.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            phase['calls'] += 1
+            phase['seconds'] += seconds
+
+    def record_request(self, url, status, seconds, bytes_sent, bytes_received):
+        """
+        :param url: the request URL, its page query parameter tells the pagination depth
+        """
+        page = urlparse.parse_qs(urlparse.urlparse(url).query).get('page')
+        page = int(page[0]) if page and page[0].isdigit() else 1
+        with self._lock:
+            self.requests += 1
+            self.request_seconds += seconds
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if page > 1:
+                self.paginated_requests += 1
+            self.max_page = max(self.max_page, page)
+
+    def record_connection(self, reused):
+        """
+        :param reused: whether the request was sent on a keep-alive connection opened before
+        """
+        with self._lock:
+            if reused:
+                self.connections_reused += 1
+            else:
+                self.connections_opened += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'phases': dict((name, dict(phase)) for name, phase in self.phases.items()),
+                'http': {
+                    'requests': self.requests,
+                    'seconds': self.request_seconds,
+                    'bytes_sent': self.bytes_sent,
+                    'bytes_received': self.bytes_received,
+                    'paginated_requests': self.paginated_requests,
+                    'max_page': self.max_page,
+                    'statuses': dict((str(status), count) for status, count in self.statuses.items()),
+                    'connections_opened': self.connections_opened,
+                    'connections_reused': self.connections_reused,
+                },
+            }
+
+    def summary_lines(self):
+        """
+        :return: a list of human readable lines, slowest phases first
+        """
+        stats = self.as_dict()
+        http = stats['http']
+        lines = ['HTTP: %d requests (%d not modified) in %.3fs, %d bytes received, %d bytes sent, %d paginated, '
+                 'deepest page %d, %d connections opened, %d reused' % (
+                     http['requests'], http['statuses'].get('304', 0), http['seconds'], http['bytes_received'],
+                     http['bytes_sent'], http['paginated_requests'], http['max_page'], http['connections_opened'],
+                     http['connections_reused'])]
+        for name, phase in sorted(stats['phases'].items(), key=lambda item: -item[1]['seconds']):
+            lines.append('%-40s %4d calls %8.3fs' % (name, phase['calls'], phase['seconds']))
+        return lines
+
+
+collector = Stats()
+
+
+class phase(object):
+    """
+    Context manager that times a block as one call of the named phase
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._span = None
+
+    def __enter__(self):
+        tracer = _get_tracer()
+        if tracer is not None:
+            self._span = tracer.start_as_current_span(self.name)
+            self._span.__enter__()
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        collector.record_phase(self.name, time.time() - self._start)
+        if self._span is not None:
+            self._span.__exit__(exc_type, exc_value, traceback)
+        return False
+
+
+def timed(name):
+    """
+    Decorator that times every call of a function as the named phase. Phases nest, the time of an
+    outer phase includes its inner phases and any HTTP requests made in it.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
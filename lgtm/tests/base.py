@@ -12,4 +12,5 @@ class MockPyGithubTests(unittest.TestCase):
         self.addCleanup(github_patcher.stop)
         self.org = mock_github.create_fake_org()
         self.repo = mock_github.create_fake_repo()
+        mock_github.reset_api_calls()
         super(MockPyGithubTests, self).setUp()
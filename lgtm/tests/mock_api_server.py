@@ -0,0 +1,95 @@
+"""
+A local HTTP stand-in for the GitHub API. Tests register handlers for (method, path) pairs and
+point a client at MockAPIServer.url.
+"""
+import BaseHTTPServer
+import json
+import SocketServer
+import threading
+import urlparse
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class MockRequest(object):
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self):
+        url = urlparse.urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        request = MockRequest(
+            method=self.command,
+            path=url.path,
+            query=dict(urlparse.parse_qsl(url.query)),
+            headers=dict((k.lower(), v) for k, v in self.headers.items()),
+            body=self.rfile.read(length) if length else '')
+        self.server.mock.requests.append(request)
+        handler = self.server.mock.routes.get((self.command, url.path))
+        if handler:
+            status, headers, body = handler(request)
+        else:
+            status, headers, body = 404, {}, {'message': 'Not Found'}
+        if not isinstance(body, basestring):
+            body = json.dumps(body)
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockAPIServer(object):
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.01})
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % (self.host, self.port)
+
+    def add_route(self, method, path, handler):
+        """
+        :param handler: callable taking a MockRequest and returning (status, headers, body), where
+            body is a string or a JSON-serializable object
+        """
+        self.routes[(method, path)] = handler
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,8 +1,38 @@
+import base64
+import hashlib
+import time
+
 from dateutil import parser as dateutil_parser
 from github import UnknownObjectException
 from github.PullRequestPart import PullRequestPart
 
 
+_api_calls = []
+_latency = {'seconds': 0}
+
+
+def record_api_call(name):
+    _api_calls.append(name)
+    if _latency['seconds']:
+        time.sleep(_latency['seconds'])
+
+
+def set_latency(seconds):
+    """
+    Make every mock API call take this long, to simulate network round trips
+    """
+    _latency['seconds'] = seconds
+
+
+def get_api_calls():
+    return list(_api_calls)
+
+
+def reset_api_calls():
+    del _api_calls[:]
+    _latency['seconds'] = 0
+
+
 _org_state = {
     'name': None,
     'current_user_login': None,
@@ -26,6 +56,7 @@ def create_fake_org(**kwargs):
 _repo_state = {
     'name': None,
     'file_contents': {},
+    'statuses': [],
 }
 
 
@@ -37,12 +68,17 @@ def create_fake_repo(**kwargs):
                       '@bar *.js\n'
                       '@OrgName/team1 build/*\n'
             },
+        statuses=[],
     )
     defaults.update(kwargs)
     global _repo_state
     _repo_state.update(defaults)
 
 
+def get_statuses():
+    return list(_repo_state['statuses'])
+
+
 _pull_request_state = {}
 
 
@@ -69,6 +105,15 @@ def create_fake_pull_request(**kwargs):
     _pull_request_state = {defaults.get('id'): defaults}
 
 
+def add_fake_pull_request(**kwargs):
+    """
+    Like create_fake_pull_request(), but keeps the pull requests that already exist
+    """
+    existing = dict(_pull_request_state)
+    create_fake_pull_request(**kwargs)
+    _pull_request_state.update(existing)
+
+
 class MockPyGithub(object):
 
     def __init__(self, login_or_token):
@@ -76,9 +121,11 @@ class MockPyGithub(object):
 
     def get_organization(self, login):
         # TODO: check that this org name is correct
+        record_api_call('get_organization')
         return MockOrganization(login)
 
     def get_user(self, login=None):
+        record_api_call('get_user')
         login = login or _org_state['current_user_login']
         return MockUser(login)
 
@@ -92,11 +139,13 @@ class MockUser(object):
 
 class MockTeam(object):
 
-    def __init__(self, name, member_logins=None):
+    def __init__(self, name, member_logins=None, slug=None):
         self.name = name
+        self.slug = slug or name
         self.member_logins = member_logins or []
 
     def get_members(self):
+        record_api_call('get_members')
         return [MockUser(login) for login in self.member_logins]
 
 
@@ -106,28 +155,56 @@ class MockOrganization(object):
         self.login = login
 
     def get_repo(self, full_name_or_id, lazy=True):
+        record_api_call('get_repo')
         return MockRepository(full_name_or_id)
 
     def get_teams(self):
+        record_api_call('get_teams')
         return _org_state['teams']
 
+    def get_team_by_slug(self, slug):
+        record_api_call('get_team_by_slug')
+        for team in _org_state['teams']:
+            if team.slug == slug:
+                return team
+        raise UnknownObjectException(404, 'not found')
+
 
 class MockRepository(object):
 
     def __init__(self, full_name_or_id):
         self.full_name_or_id = full_name_or_id
+        self.default_branch = 'master'
 
     def get_pull(self, number):
+        record_api_call('get_pull')
         if number not in _pull_request_state:
             raise UnknownObjectException(404, 'not found')
         return MockPullRequest.from_state(id=number)
 
     def get_issue(self, number):
+        record_api_call('get_issue')
         if number not in _pull_request_state:
             raise UnknownObjectException(404, 'not found')
-        return MockIssue()
+        return MockIssue(number)
+
+    def get_commit(self, sha):
+        record_api_call('get_commit')
+        return MockCommit(None, sha=sha)
+
+    def get_git_tree(self, sha, recursive=False):
+        record_api_call('get_git_tree')
+        return MockGitTree(_repo_state['file_contents'])
+
+    def get_git_blob(self, sha):
+        record_api_call('get_git_blob')
+        for contents in _repo_state['file_contents'].values():
+            if MockFileContents(contents).sha == sha:
+                return MockGitBlob(contents)
+        raise UnknownObjectException(404, 'not found')
 
     def get_file_contents(self, path, ref=None):
+        record_api_call('get_file_contents')
         if path not in _repo_state['file_contents']:
             raise UnknownObjectException(404, 'not found')
         return MockFileContents(_repo_state['file_contents'].get(path))
@@ -136,9 +213,33 @@ class MockRepository(object):
 class MockFileContents(object):
 
     def __init__(self, contents):
+        self.sha = hashlib.sha1(contents).hexdigest()
         self.decoded_content = contents
 
 
+class MockGitTree(object):
+
+    def __init__(self, file_contents):
+        self.tree = [MockGitTreeElement(path, MockFileContents(contents).sha)
+                     for path, contents in sorted(file_contents.items())]
+        self.sha = hashlib.sha1(repr(sorted(file_contents.items()))).hexdigest()
+
+
+class MockGitTreeElement(object):
+
+    def __init__(self, path, sha):
+        self.path = path
+        self.sha = sha
+        self.type = 'blob'
+
+
+class MockGitBlob(object):
+
+    def __init__(self, contents):
+        self.content = base64.b64encode(contents)
+        self.encoding = 'base64'
+
+
 class MockPullRequest(object):
 
     def __init__(self, id, author, last_commit_date, file_paths, comments, **kwargs):
@@ -148,7 +249,9 @@ class MockPullRequest(object):
         self._last_commit_date = dateutil_parser.parse(last_commit_date)
         self._file_paths = file_paths
         self._comments = comments
+        self._reviews = kwargs.get('reviews', [])
         self.base = PullRequestPart(None, None, {"ref": "master"}, False)
+        self.head = PullRequestPart(None, None, {"ref": "feature", "sha": kwargs.get('head_sha', "sha%d" % id)}, False)
 
     @classmethod
     def from_state(cls, id):
@@ -159,51 +262,111 @@ class MockPullRequest(object):
         return MockUser(self._author)
 
     def get_issue_comments(self):
-        return [MockComment(*comment) for comment in self._comments]
+        record_api_call('get_issue_comments')
+        return get_comments(self._comments)
 
     def create_issue_comment(self, body):
-        pass
+        record_api_call('create_issue_comment')
+        created_at = self._comments[-1][0] if self._comments else self._last_commit_date_str
+        self._comments.append((created_at, _org_state['current_user_login'], body))
+        return get_comments(self._comments)[-1]
 
     def get_files(self):
+        record_api_call('get_files')
         return [MockFile(f) for f in self._file_paths]
 
+    def get_reviews(self):
+        record_api_call('get_reviews')
+        return [MockReview(*review) for review in self._reviews]
+
     def get_commits(self):
         # don't need anything except the most recent date
+        record_api_call('get_commits')
         return [MockCommit(self._last_commit_date_str), ]
 
 
 class MockCommit(object):
 
-    def __init__(self, last_modified):
+    def __init__(self, last_modified, sha=None):
+        self.sha = sha
         self.last_modified = last_modified
-        self.commit = MockGithubCommit(last_modified)
+        self.commit = MockGithubCommit(last_modified) if last_modified else None
+
+    def create_status(self, state, target_url=None, description=None, context=None):
+        record_api_call('create_status')
+        _repo_state['statuses'].append(
+            dict(sha=self.sha, state=state, description=description, context=context))
 
 
 class MockGithubCommit(object):
 
     def __init__(self, last_modified):
         self.last_modified = last_modified
+        self.committer = MockGitAuthor(dateutil_parser.parse(last_modified))
         self.raw_headers = ''
 
 
+class MockGitAuthor(object):
+
+    def __init__(self, date):
+        self.date = date
+
+
 class MockFile(object):
 
     def __init__(self, filename):
         self.filename = filename
 
 
+def get_comments(comments):
+    """
+    :param comments: (created_at, login, body) tuples, the ids are their positions starting at 1
+    """
+    return [MockComment(*comment, id=i) for i, comment in enumerate(comments, 1)]
+
+
 class MockComment(object):
 
-    def __init__(self, created_at, login, body):
+    def __init__(self, created_at, login, body, id=None):
+        self.id = id
         self.created_at = dateutil_parser.parse(created_at)
+        self.updated_at = self.created_at
         self.user = MockUser(login)
         self.body = body
 
+    def edit(self, body):
+        record_api_call('edit_comment')
+        self.body = body
+
+
+class MockReview(object):
+
+    def __init__(self, submitted_at, login, state, commit_id):
+        self.submitted_at = dateutil_parser.parse(submitted_at)
+        self.user = MockUser(login)
+        self.state = state
+        self.commit_id = commit_id
+
 
 class MockIssue(object):
 
-    def __init__(self):
+    def __init__(self, number=None):
+        self.number = number
         self.assignee = None
 
     def edit(self, assignee):
+        record_api_call('edit_issue')
         self.assignee = assignee
+
+    @property
+    def comments(self):
+        return len(_pull_request_state[self.number]['comments'])
+
+    def get_comments(self, since=None):
+        record_api_call('get_comments')
+        comments = get_comments(_pull_request_state[self.number]['comments'])
+        return [comment for comment in comments if since is None or comment.updated_at >= since]
+
+    def get_comment(self, id):
+        record_api_call('get_comment')
+        return get_comments(_pull_request_state[self.number]['comments'])[id - 1]
@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+import unittest
+
+from lgtm import cache
+
+
+class ObjectCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_get_set(self):
+        object_cache = cache.ObjectCache(self.cache_dir, 'owners')
+        self.assertEquals(object_cache.get('sha'), None)
+        object_cache.set('sha', {'rules': [('foo', None)]})
+        self.assertEquals(cache.ObjectCache(self.cache_dir, 'owners').get('sha'), {'rules': [('foo', None)]})
+        self.assertEquals(cache.ObjectCache(self.cache_dir, 'other').get('sha'), None)
+
+    def test_eviction(self):
+        object_cache = cache.ObjectCache(self.cache_dir, 'owners', max_entries=2)
+        for key in ('a', 'b', 'c'):
+            object_cache.set(key, key)
+        self.assertEquals([object_cache.get(key) for key in ('a', 'b', 'c')], [None, 'b', 'c'])
+
+
+class ResponseCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_get_set(self):
+        response_cache = cache.ResponseCache(self.cache_dir)
+        self.assertEquals(response_cache.get('url'), None)
+        response_cache.set('url', 200, {'etag': '"abc"'}, '{}')
+        cached = cache.ResponseCache(self.cache_dir).get('url')
+        self.assertEquals((cached.status, cached.etag, cached.body), (200, '"abc"', '{}'))
+
+    def test_make_key_varies_by_token(self):
+        self.assertNotEquals(
+            cache.ResponseCache.make_key('url', {'Authorization': 'token a'}),
+            cache.ResponseCache.make_key('url', {'Authorization': 'token b'}))
+
+    def test_lru_eviction(self):
+        response_cache = cache.ResponseCache(self.cache_dir, max_bytes=10)
+        response_cache.set('a', 200, {}, '1234')
+        response_cache.set('b', 200, {}, '1234')
+        response_cache.get('a')
+        response_cache.set('c', 200, {}, '1234')
+        self.assertNotEquals(response_cache.get('a'), None)
+        self.assertEquals(response_cache.get('b'), None)
+        self.assertNotEquals(response_cache.get('c'), None)
+        self.assertEquals(response_cache.size, 8)
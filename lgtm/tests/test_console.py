@@ -1,3 +1,11 @@
+import json
+import os
+import subprocess
+import StringIO
+import sys
+import tempfile
+import unittest
+
 import mock_github
 from base import MockPyGithubTests
 from lgtm import console
@@ -64,3 +72,73 @@ class ConsoleTests(MockPyGithubTests):
         console.main([
             '--version',
         ], do_exit=False)
+
+    def test_batch(self):
+        mock_github.create_fake_pull_request(id=1)
+        mock_github.add_fake_pull_request(id=2, comments=[])
+        stdin = StringIO.StringIO(
+            '{"org": "OrgName", "repo": "repo-name", "pr_number": 1}\n'
+            '\n'
+            '{"org": "OrgName", "repo": "repo-name", "pr_number": 3}\n'
+            'not json\n')
+        stdout = StringIO.StringIO()
+        exit_code = console.batch(['--github-token', 'foo', '--max-workers', '1'],
+                                  do_exit=False, stdin=stdin, stdout=stdout)
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEquals(exit_code, 1)
+        self.assertEquals(len(records), 3)
+        self.assertEquals(sorted(r.get('pr_number') for r in records), [None, 1, 3])
+        by_number = dict((r.get('pr_number'), r) for r in records)
+        self.assertEquals(by_number[1]['ready'], False)
+        self.assertIn('error', by_number[3])
+        self.assertIn('Bad pull request reference', by_number[None]['error'])
+        self.assertEquals(mock_github.get_api_calls().count('get_file_contents'), 1)
+
+
+class StatsJsonTests(MockPyGithubTests):
+
+    def test_stats_json(self):
+        mock_github.create_fake_pull_request(id=1)
+        stats_file = tempfile.NamedTemporaryFile()
+        self.addCleanup(stats_file.close)
+        console.main(['--github-token', 'foo', '--github-org', 'OrgName', '--github-repo', 'repo-name',
+                      '--github-pr-number', '1', '--stats-json', stats_file.name], do_exit=False)
+        report = json.load(open(stats_file.name))
+        self.assertEquals(report['phases']['evaluate_pull_request']['calls'], 1)
+        self.assertIn('OwnersMatcher.get_owners_of_files', report['phases'])
+        self.assertIn('requests', report['http'])
+
+
+class ImportTimeTests(unittest.TestCase):
+    """
+    `lgtm --version`, `--help` and the integration options must not import the modules that are
+    only needed to evaluate a pull request, they make every CI run slower to start
+    """
+    heavy_modules = ('github', 'dateutil', 'pkg_resources', 'sqlite3', 'httplib')
+
+    def assertNoHeavyImports(self, statement, env=None):
+        script = (
+            'import sys\n'
+            'from lgtm import console\n'
+            'try:\n'
+            '    %s\n'
+            'except SystemExit:\n'
+            '    pass\n'
+            'sys.stderr.write("heavy:" + ",".join(m for m in %r if m in sys.modules))\n' % (
+                statement, self.heavy_modules))
+        process = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   env=dict(os.environ, **(env or {})))
+        stdout, stderr = process.communicate()
+        self.assertEquals(process.returncode, 0, stderr)
+        self.assertEquals(stderr.splitlines()[-1], 'heavy:')
+
+    def test_version(self):
+        self.assertNoHeavyImports('console.main(["--version"])')
+
+    def test_help(self):
+        self.assertNoHeavyImports('console.main(["--help"])')
+
+    def test_integration(self):
+        self.assertNoHeavyImports(
+            'console.get_options_parser(["--github-token", "foo", "--integration", "jenkins"], do_exit=False)',
+            env={'ghprbPullLink': 'https://github.com/OrgName/repo-name/pull/1'})
@@ -1,7 +1,19 @@
+import datetime
+import mock
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+import unittest
+
+from github import Github
+
 import mock_github
 
 from base import MockPyGithubTests
 from lgtm import git
+from mock_api_server import MockAPIServer
 
 
 class GitTests(MockPyGithubTests):
@@ -17,3 +29,367 @@ class GitTests(MockPyGithubTests):
         self.assertEquals(
             sorted(git_hub.expand_teams(['foo', 'OrgName/team1'])),
             sorted(['foo', 'bat', 'baz']))
+
+    def test_expand_teams_in_parallel(self):
+        mock_github.create_fake_org(teams=[mock_github.MockTeam('team%d' % i, ['user%d' % i, 'shared'])
+                                           for i in range(8)])
+        names = ['foo'] + ['OrgName/team%d' % i for i in range(8)] + ['OrgName/team0', 'bar']
+        expected = git.GitHub('foo', 'bar', 'bat', team_workers=1).expand_teams(names)
+        self.assertEquals(expected, ['foo', 'user0', 'shared'] + ['user%d' % i for i in range(1, 8)] + ['bar'])
+        mock_github.set_latency(0.05)
+        self.addCleanup(mock_github.set_latency, 0)
+        start = time.time()
+        self.assertEquals(git.GitHub('foo', 'bar', 'bat', team_workers=8).expand_teams(names), expected)
+        # 8 teams, each a lookup and a member listing
+        self.assertLess(time.time() - start, 8 * 2 * 0.05)
+
+    def test_expand_teams_error(self):
+        git_hub = git.GitHub('foo', 'bar', 'bat', team_workers=2)
+        def get_members(git_hub, team_name):
+            raise ValueError('boom')
+
+        with mock.patch.object(git_hub.team_resolver, 'get_members', side_effect=get_members):
+            try:
+                git_hub.expand_teams(['OrgName/team1', 'OrgName/team2'])
+            except ValueError:
+                function_names = [frame[2] for frame in traceback.extract_tb(sys.exc_info()[2])]
+            else:
+                self.fail('expand_teams() did not raise')
+        self.assertEquals(function_names[-1], 'get_members')
+
+    def test_connects_once(self):
+        mock_github.create_fake_pull_request(id=1)
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name')
+        git_hub.read_file_lines()
+        pull_request = git_hub.get_pull_request(1)
+        git_hub.expand_teams(['foo', 'OrgName/team1'])
+        pull_request.create_or_update_comment('hello')
+        api_calls = mock_github.get_api_calls()
+        self.assertEquals(api_calls.count('get_organization'), 1)
+        self.assertEquals(api_calls.count('get_repo'), 1)
+        self.assertEquals(api_calls.count('get_user'), 1)
+
+    def test_invalidate(self):
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name')
+        git_hub.read_file_lines()
+        git_hub.invalidate()
+        git_hub.read_file_lines()
+        self.assertEquals(mock_github.get_api_calls().count('get_repo'), 2)
+
+
+class OwnersMatcherCacheTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(OwnersMatcherCacheTests, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_cached_by_blob_sha(self):
+        git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir).get_owners_matcher()
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir)
+        with mock.patch('lgtm.owners.parse') as parse:
+            matcher = git_hub.get_owners_matcher()
+            self.assertFalse(parse.called)
+        self.assertEquals(matcher.get_owners_of_files(['a.js']), (['foo', 'bar'], ['bar']))
+
+    def test_changed_file(self):
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir)
+        git_hub.get_owners_matcher()
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@baz *.js'})
+        self.assertEquals(git_hub.get_owners_matcher().get_owners_of_files(['a.js']), (['baz'], ['baz']))
+
+    def test_owners_tree(self):
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@foo', 'src/OWNERS': '@bar *.js', 'src/a.js': ''})
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir)
+        owners_tree = git_hub.get_owners_tree()
+        self.assertEquals(owners_tree.get_owners_of_files(['src/a.js', 'b.js']), (['foo', 'bar'], ['bar']))
+        self.assertEquals(mock_github.get_api_calls().count('get_git_blob'), 2)
+        git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir).get_owners_tree()
+        self.assertEquals(mock_github.get_api_calls().count('get_git_blob'), 2)
+
+    def test_missing_file(self):
+        mock_github.create_fake_repo(file_contents={})
+        self.assertEquals(git.GitHub('foo', 'OrgName', 'repo-name').get_owners_matcher().rules, [])
+
+
+class PullRequestTests(MockPyGithubTests):
+
+    def test_last_commit_date_from_commit_list(self):
+        mock_github.create_fake_pull_request(id=1, last_commit_date='2016-01-01 00:00:01')
+        pull_request = git.GitHub('foo', 'bar', 'bat').get_pull_request(1)
+        with mock.patch('lgtm.git.dateutil_parser') as dateutil_parser:
+            self.assertEquals(pull_request.last_commit_date, datetime.datetime(2016, 1, 1, 0, 0, 1))
+            self.assertFalse(dateutil_parser.parse.called)
+
+    def test_last_commit_date_accurate(self):
+        mock_github.create_fake_pull_request(id=1, last_commit_date='2016-01-01 00:00:01')
+        pull_request = git.GitHub('foo', 'bar', 'bat').get_pull_request(1, accurate_commit_dates=True)
+        self.assertEquals(pull_request.last_commit_date, datetime.datetime(2016, 1, 1, 0, 0, 1))
+
+
+class SignOffSourceTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(SignOffSourceTests, self).setUp()
+        mock_github.create_fake_pull_request(
+            id=1, author='bat', last_commit_date='2016-01-01 00:00:01',
+            comments=[
+                ('2016-01-01 00:00:02', 'foo', 'lgtm'),
+                ('2016-01-01 00:00:02', 'bar', 'lgtm'),
+            ],
+            reviews=[
+                ('2016-01-01 00:00:03', 'baz', 'APPROVED', 'sha0'),  # stale, an earlier commit
+                ('2016-01-01 00:00:03', 'boo', 'APPROVED', 'sha1'),
+                ('2016-01-01 00:00:03', 'bat', 'APPROVED', 'sha1'),  # the author
+                ('2016-01-01 00:00:04', 'bar', 'APPROVED', 'sha1'),
+                ('2016-01-01 00:00:05', 'bar', 'CHANGES_REQUESTED', 'sha1'),
+                ('2016-01-01 00:00:06', 'bar', 'COMMENTED', 'sha1'),
+            ])
+
+    def _signed_off_by(self, signoff_source):
+        return git.GitHub('foo', 'OrgName', 'repo-name').get_pull_request(
+            1, signoff_source=signoff_source).signed_off_by()
+
+    def test_comments(self):
+        self.assertEquals(self._signed_off_by('comments'), ['foo', 'bar'])
+        self.assertNotIn('get_reviews', mock_github.get_api_calls())
+
+    def test_reviews(self):
+        self.assertEquals(self._signed_off_by('reviews'), ['boo'])
+        self.assertNotIn('get_issue_comments', mock_github.get_api_calls())
+
+    def test_both(self):
+        self.assertEquals(self._signed_off_by('both'), ['foo', 'boo'])
+
+
+class SignOffDetectorTests(unittest.TestCase):
+
+    def _comment(self, login, body, created_at='2016-01-01 00:00:02'):
+        return mock_github.MockComment(created_at, login, body)
+
+    def test_matches(self):
+        detector = git.SignOffDetector()
+        for body in ('LGTM', 'looks good, lgtm!', ':shipit:', ':+1:'):
+            self.assertTrue(detector.matches(body), body)
+        for body in ('algtm', 'not yet', ':+1', 'x' * 10000):
+            self.assertFalse(detector.matches(body), body)
+
+    def test_regex_aliases(self):
+        detector = git.SignOffDetector([r'(?i)\bship\s*it\b'])
+        self.assertTrue(detector.matches('Ship  it'))
+        self.assertFalse(detector.matches('lgtm'))
+
+    def test_alias_literal(self):
+        self.assertEquals(git._alias_literal(r'(?i)\blgtm\b'), ('lgtm', True))
+        self.assertEquals(git._alias_literal(r':\+1:'), (':+1:', False))
+        self.assertEquals(git._alias_literal(r'\d+'), None)
+        self.assertEquals(git._alias_literal(r'ship ?it'), None)
+        self.assertEquals(git._alias_literal(r'c:\\bin'), ('c:\\bin', False))
+
+    def test_case_insensitive_combined_regex(self):
+        detector = git.SignOffDetector()
+        for body in (':SHIPIT:', ':ShipIt:'):
+            self.assertTrue(detector.matches(body), body)
+            self.assertTrue(git.LGTM_ALIAS_RE.search(body), body)
+        detector = git.SignOffDetector(['ship it', r'(?i)\bok\b'])
+        self.assertTrue(detector.matches('SHIP IT'))
+        self.assertFalse(git.SignOffDetector(['ship it']).matches('SHIP IT'))
+
+    def test_escaped_aliases(self):
+        detector = git.SignOffDetector([r'c:\\bin', r'(?i)\bship\-it\b'])
+        self.assertEquals(detector._literals, [('c:\\bin', True), ('ship-it', True)])
+        self.assertTrue(detector.matches('see c:\\bin'))
+        self.assertFalse(detector.matches('see c:in'))
+        self.assertTrue(detector.matches('Ship-It!'))
+        self.assertFalse(detector.matches('reship-it'))
+
+    def test_signed_off_by(self):
+        comments = [
+            self._comment('foo', 'lgtm', created_at='2016-01-01 00:00:00'),  # too early
+            self._comment('bar', 'lgtm'),
+            self._comment('bat', 'lgtm'),
+            self._comment('foo', 'lgtm'),
+            self._comment('baz', 'nope'),
+        ]
+        since = comments[1].created_at
+        self.assertEquals(git.SignOffDetector().signed_off_by(comments, since=since, except_login='bat'),
+                          ['bar', 'foo'])
+
+    def test_stops_scanning_author(self):
+        detector = git.SignOffDetector()
+        comments = [self._comment('foo', 'lgtm'), self._comment('foo', 'lgtm again')]
+        with mock.patch.object(detector, 'matches', return_value=True) as matches:
+            self.assertEquals(detector.signed_off_by(comments), ['foo'])
+        self.assertEquals(matches.call_count, 1)
+
+
+class CommentSnapshotTests(unittest.TestCase):
+
+    def test_indexes(self):
+        comments = mock_github.get_comments([
+            ('2016-01-01 00:00:01', 'foo', 'lgtm'),
+            ('2016-01-01 00:00:02', 'bot', git.DEFAULT_REVIEW_COMMENT_PREFIX + ' @foo'),
+            ('2016-01-01 00:00:03', 'bot', git.DEFAULT_REVIEW_COMMENT_PREFIX + ' @bar'),
+        ])
+        snapshot = git.CommentSnapshot(comments)
+        self.assertEquals([c.id for c in snapshot.comments], [1, 2, 3])
+        self.assertEquals(snapshot.get_review_comment('bot').id, 2)
+        self.assertEquals(snapshot.get_review_comment('foo'), None)
+
+    def test_compact(self):
+        comments = mock_github.get_comments([
+            ('2016-01-01 00:00:01', 'foo', 'lgtm'),
+            ('2016-01-01 00:00:02', 'ci-bot', 'coverage report ' * 100),
+            ('2016-01-01 00:00:03', 'bot', git.DEFAULT_REVIEW_COMMENT_PREFIX + ' @foo'),
+        ])
+        snapshot = git.CommentSnapshot(comments, compact=True)
+        self.assertEquals([c.id for c in snapshot.comments], [1, 2, 3])
+        self.assertIsInstance(snapshot.comments[0], git._SnapshotComment)
+        self.assertIs(snapshot.comments[2], comments[2])
+        self.assertEquals(snapshot.get_review_comment('bot').id, 3)
+
+    def test_bodies_scanned_once(self):
+        comments = git.CommentSnapshot(mock_github.get_comments([
+            ('2016-01-01 00:00:01', 'foo', 'lgtm'),  # too early
+            ('2016-01-01 00:00:02', 'author', 'lgtm'),
+            ('2016-01-01 00:00:03', 'ci-bot', 'coverage report'),
+            ('2016-01-01 00:00:04', 'bar', 'lgtm'),
+        ]), compact=True).comments
+        detector = git.SignOffDetector()
+        since = comments[1].created_at
+        with mock.patch.object(detector, 'matches', wraps=detector.matches) as matches:
+            for _ in range(2):
+                self.assertEquals(detector.signed_off_by(comments, since=since, except_login='author'), ['bar'])
+        self.assertEquals(sorted(call[0][0] for call in matches.call_args_list), ['coverage report', 'lgtm'])
+        # the body of the comment that was scanned and doesn't sign off is let go
+        self.assertEquals([c.body for c in comments], ['lgtm', 'lgtm', '', 'lgtm'])
+
+
+class PullRequestSnapshotTests(MockPyGithubTests):
+
+    def test_snapshot(self):
+        mock_github.create_fake_pull_request(id=1, author='foo', head_sha='sha1')
+        pull_request = git.GitHub('foo', 'OrgName', 'repo-name').get_pull_request(1)
+        self.assertEquals((pull_request.author, pull_request.base_branch, pull_request.head_sha),
+                          ('foo', 'master', 'sha1'))
+
+    def test_unicode_login_interned(self):
+        # PyGithub decodes logins to unicode
+        self.assertIs(git.PullRequestSnapshot(1, u'foo', 'master', 'sha1').author, intern('foo'))
+
+
+class IncrementalCommentsTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(IncrementalCommentsTests, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.comments = [
+            ('2016-01-01 00:00:02', 'foo', 'lgtm'),
+            ('2016-01-01 00:00:03', 'bar', 'a question'),
+        ]
+        mock_github.create_fake_pull_request(id=1, last_commit_date='2016-01-01 00:00:01', comments=self.comments)
+
+    def _signed_off_by(self):
+        mock_github.reset_api_calls()
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir, incremental_comments=True)
+        return git_hub.get_pull_request(1).signed_off_by()
+
+    def test_only_new_comments_fetched(self):
+        self.assertEquals(self._signed_off_by(), ['foo'])
+        self.comments.append(('2016-01-01 00:00:04', 'bar', 'lgtm'))
+        with mock.patch.object(mock_github.MockIssue, 'get_comments',
+                               autospec=True, side_effect=mock_github.MockIssue.get_comments) as get_comments:
+            self.assertEquals(self._signed_off_by(), ['foo', 'bar'])
+        self.assertEquals(get_comments.call_args[1]['since'], datetime.datetime(2016, 1, 1, 0, 0, 3))
+        self.assertNotIn('get_issue_comments', mock_github.get_api_calls())
+
+    def test_edited_comment(self):
+        self.assertEquals(self._signed_off_by(), ['foo'])
+        self.comments[0] = ('2016-01-01 00:00:05', 'foo', 'actually, not yet')
+        self.assertEquals(self._signed_off_by(), [])
+
+    def test_deleted_comment(self):
+        self.assertEquals(self._signed_off_by(), ['foo'])
+        del self.comments[0]
+        self.assertEquals(self._signed_off_by(), [])
+
+    def test_new_head_starts_over(self):
+        self.assertEquals(self._signed_off_by(), ['foo'])
+        mock_github.create_fake_pull_request(id=1, head_sha='sha2', last_commit_date='2016-01-01 00:00:03',
+                                             comments=self.comments)
+        with mock.patch.object(mock_github.MockIssue, 'get_comments',
+                               autospec=True, side_effect=mock_github.MockIssue.get_comments) as get_comments:
+            self.assertEquals(self._signed_off_by(), [])
+        self.assertNotIn('since', get_comments.call_args[1])
+
+    def test_update_existing_comment(self):
+        self.comments.append(('2016-01-01 00:00:04', 'bot', git.DEFAULT_REVIEW_COMMENT_PREFIX + ' @foo'))
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir, incremental_comments=True)
+        git_hub.get_pull_request(1).create_or_update_comment(git.DEFAULT_REVIEW_COMMENT_PREFIX + ' @bar')
+        self.assertEquals(mock_github.get_api_calls()[-2:], ['get_comment', 'edit_comment'])
+
+
+class TeamResolverTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(TeamResolverTests, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_lookup_by_slug(self):
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name')
+        self.assertEquals(git_hub.get_team_members('OrgName/team1'), ['bat', 'baz'])
+        self.assertEquals(git_hub.get_team_members('OrgName/team1'), ['bat', 'baz'])
+        api_calls = mock_github.get_api_calls()
+        self.assertEquals(api_calls.count('get_team_by_slug'), 1)
+        self.assertEquals(api_calls.count('get_members'), 1)
+        self.assertNotIn('get_teams', api_calls)
+
+    def test_fallback_to_name(self):
+        mock_github.create_fake_org(teams=[mock_github.MockTeam('Team One', ['bat'], slug='team-one')])
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name')
+        self.assertEquals(git_hub.get_team_members('OrgName/Team One'), ['bat'])
+        self.assertEquals(git_hub.get_team_members('OrgName/team-one'), ['bat'])
+        self.assertEquals(git_hub.get_team_members('OrgName/missing'), [])
+
+    def test_ttl_cache_between_runs(self):
+        git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir, team_cache_ttl=60) \
+            .expand_teams(['OrgName/team1'])
+        mock_github.reset_api_calls()
+        mock_github.create_fake_org(teams=[mock_github.MockTeam('team1', ['someone-else'])])
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir, team_cache_ttl=60)
+        self.assertEquals(git_hub.expand_teams(['OrgName/team1']), ['bat', 'baz'])
+        self.assertEquals(mock_github.get_api_calls(), [])
+
+    def test_ttl_cache_expired(self):
+        git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir, team_cache_ttl=-1) \
+            .expand_teams(['OrgName/team1'])
+        mock_github.create_fake_org(teams=[mock_github.MockTeam('team1', ['someone-else'])])
+        git_hub = git.GitHub('foo', 'OrgName', 'repo-name', cache_dir=self.cache_dir, team_cache_ttl=-1)
+        self.assertEquals(git_hub.expand_teams(['OrgName/team1']), ['someone-else'])
+
+
+class GetTeamBySlugTests(unittest.TestCase):
+
+    def test_rest_lookup(self):
+        server = MockAPIServer()
+        self.addCleanup(server.stop)
+        server.add_route('GET', '/orgs/OrgName', lambda request: (200, {}, {
+            'login': 'OrgName', 'url': server.url + '/orgs/OrgName'}))
+        server.add_route('GET', '/orgs/OrgName/teams/team1', lambda request: (200, {}, {
+            'id': 1, 'name': 'Team One', 'slug': 'team1'}))
+        org = Github('token', base_url=server.url).get_organization('OrgName')
+        self.assertEquals(git._get_team_by_slug(org, 'team1').name, 'Team One')
+
+    def test_team_name_with_space(self):
+        server = MockAPIServer()
+        self.addCleanup(server.stop)
+        server.add_route('GET', '/orgs/OrgName', lambda request: (200, {}, {
+            'login': 'OrgName', 'url': server.url + '/orgs/OrgName'}))
+        server.add_route('GET', '/orgs/OrgName/teams', lambda request: (200, {}, [
+            {'id': 1, 'name': 'Team One', 'slug': 'team-one', 'url': server.url + '/teams/1'}]))
+        server.add_route('GET', '/teams/1/members', lambda request: (200, {}, [{'login': 'foo'}]))
+        org = Github('token', base_url=server.url).get_organization('OrgName')
+        self.assertEquals(git.TeamResolver()._fetch_members(org, 'Team One'), ['foo'])
+        self.assertIn('/orgs/OrgName/teams/Team%20One', [request.path for request in server.requests])
@@ -0,0 +1,142 @@
+import re
+
+from github import UnknownObjectException
+
+import mock_github
+from base import MockPyGithubTests
+from lgtm import graphql
+from lgtm import pull_request_ready_to_merge
+from mock_api_server import MockAPIServer
+
+
+class FakeGraphQLAPI(object):
+    """
+    Answers the queries in lgtm.graphql from a fixed pull request, using list offsets as cursors
+    """
+
+    def __init__(self, number=1, author='bat', files=None, comments=None, commit_dates=None, reviews=None):
+        self.number = number
+        self.author = author
+        self.connections = {
+            'files': [{'path': path} for path in files or []],
+            'comments': [
+                {'id': 'C%d' % i, 'databaseId': i, 'author': {'login': login}, 'body': body,
+                 'createdAt': created_at}
+                for i, (created_at, login, body) in enumerate(comments or [])
+            ],
+            'commits': [
+                {'commit': {'oid': 'sha%d' % i, 'committedDate': date}}
+                for i, date in enumerate(commit_dates or [])
+            ],
+            'latestOpinionatedReviews': [
+                {'author': {'login': login}, 'state': state, 'commit': {'oid': oid}, 'submittedAt': submitted_at}
+                for submitted_at, login, state, oid in reviews or []
+            ],
+        }
+        self.mutations = []
+
+    def _page(self, name, page_size, cursor=None):
+        start = int(cursor) if cursor else 0
+        end = start + page_size
+        return {
+            'pageInfo': {'hasNextPage': end < len(self.connections[name]), 'endCursor': str(end)},
+            'nodes': self.connections[name][start:end],
+        }
+
+    def __call__(self, request):
+        payload = request.json()
+        query, variables = payload['query'], payload['variables']
+        if query.strip().startswith('mutation'):
+            self.mutations.append(variables)
+            node = {'id': 'new', 'databaseId': 99, 'author': {'login': 'bot'},
+                    'body': variables['body'], 'createdAt': '2016-01-02T00:00:00Z'}
+            return 200, {}, {'data': {'addComment': {'commentEdge': {'node': node}},
+                                      'updateIssueComment': {'issueComment': {'id': variables.get('id')}}}}
+        if variables['number'] != self.number:
+            return 200, {}, {'data': {'repository': {'pullRequest': None}},
+                             'errors': [{'type': 'NOT_FOUND', 'message': 'not found'}]}
+        paginated = re.search(r'(\w+)\(first: \$pageSize, after: \$cursor\)', query)
+        if paginated:
+            name = paginated.group(1)
+            pull_request = {name: self._page(name, variables['pageSize'], variables['cursor'])}
+        else:
+            pull_request = dict(
+                id='PR1',
+                author={'login': self.author},
+                baseRefName='master',
+                headRefName='feature',
+                headRefOid='sha-head',
+                **dict((name, self._page(name, variables['pageSize'])) for name in self.connections))
+        return 200, {}, {'data': {'repository': {'pullRequest': pull_request}}}
+
+
+class GraphQLTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(GraphQLTests, self).setUp()
+        self.server = MockAPIServer()
+        self.addCleanup(self.server.stop)
+        self.api = FakeGraphQLAPI(
+            files=['file1', 'file2.js', 'build/foo.txt'],
+            comments=[
+                ('2016-01-01T00:00:00Z', 'foo', 'lgtm'),
+                ('2016-01-01T00:00:02Z', 'bat', 'lgtm'),
+                ('2016-01-01T00:00:03Z', 'boo', 'lgtm'),
+                ('2016-01-01T00:00:04Z', 'baz', 'some comment'),
+                ('2016-01-01T00:00:05Z', 'foo', 'lgtm'),
+            ],
+            commit_dates=['2016-01-01T00:00:01Z'])
+        self.server.add_route('POST', '/graphql', self.api)
+        self.client = graphql.GraphQLClient('token', url=self.server.url + '/graphql')
+
+    def test_single_request(self):
+        pr = graphql.PullRequest(self.client, 'OrgName', 'repo-name', 1)
+        self.assertEquals(pr.user.login, 'bat')
+        self.assertEquals(pr.base.ref, 'master')
+        self.assertEquals(pr.head.sha, 'sha-head')
+        self.assertEquals([f.filename for f in pr.get_files()], ['file1', 'file2.js', 'build/foo.txt'])
+        self.assertEquals(len(pr.get_issue_comments()), 5)
+        self.assertEquals(len(self.server.requests), 1)
+        self.assertEquals(self.server.requests[0].headers['authorization'], 'bearer token')
+
+    def test_overflow_pagination(self):
+        pr = graphql.PullRequest(self.client, 'OrgName', 'repo-name', 1, page_size=2)
+        self.assertEquals([f.filename for f in pr.get_files()], ['file1', 'file2.js', 'build/foo.txt'])
+        self.assertEquals([c.body for c in pr.get_issue_comments()][-1], 'lgtm')
+        self.assertEquals(len(pr.get_issue_comments()), 5)
+        # one query, one extra page of files, two extra pages of comments
+        self.assertEquals(len(self.server.requests), 4)
+
+    def test_reviews(self):
+        self.api.connections['latestOpinionatedReviews'] = [
+            {'author': {'login': 'baz'}, 'state': 'APPROVED', 'commit': {'oid': 'sha-head'},
+             'submittedAt': '2016-01-01T00:00:06Z'}]
+        pr = graphql.PullRequest(self.client, 'OrgName', 'repo-name', 1)
+        reviews = pr.get_reviews()
+        self.assertEquals([(r.user.login, r.state, r.commit_id) for r in reviews], [('baz', 'APPROVED', 'sha-head')])
+        self.assertEquals(len(self.server.requests), 1)
+
+    def test_not_found(self):
+        with self.assertRaises(UnknownObjectException):
+            graphql.PullRequest(self.client, 'OrgName', 'repo-name', 2)
+
+    def test_comment_mutations(self):
+        pr = graphql.PullRequest(self.client, 'OrgName', 'repo-name', 1)
+        comment = pr.create_issue_comment('hello')
+        comment.edit('goodbye')
+        self.assertEquals(comment.body, 'goodbye')
+        self.assertEquals(self.api.mutations, [
+            {'subjectId': 'PR1', 'body': 'hello'},
+            {'id': 'new', 'body': 'goodbye'},
+        ])
+
+    def test_pull_request_ready_to_merge(self):
+        mock_github.create_fake_pull_request(id=1)
+        ready = pull_request_ready_to_merge('foo', 'OrgName', 'repo-name', 1, options={
+            'use_graphql': True,
+            'graphql_url': self.server.url + '/graphql',
+        })
+        # baz still needs to sign off
+        self.assertFalse(ready)
+        # the query, then the notification comment
+        self.assertEquals(len(self.server.requests), 2)
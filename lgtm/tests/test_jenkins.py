@@ -19,6 +19,14 @@ class JenkinsIntegrationTests(MockPyGithubTests):
             }),
             dict(github_org='OrgName', github_repo='repo-name', github_pr_number='387'))
 
+    def test_get_pull_request_dict_target_branch(self):
+        self.assertEquals(
+            jenkins.get_pull_request_dict({
+                'ghprbPullLink': 'https://github.com/OrgName/repo-name/pull/387',
+                'ghprbTargetBranch': 'master',
+            }),
+            dict(github_org='OrgName', github_repo='repo-name', github_pr_number='387', base_ref='master'))
+
     def test_parse_pull_link(self):
         self.assertEquals(
             jenkins.parse_pull_link('https://github.com/OrgName/repo-name/pull/1'),
@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import mock_github
+from base import MockPyGithubTests
+from lgtm import local
+from lgtm import pull_request_ready_to_merge
+
+
+def git(path, *args):
+    subprocess.check_call(('git', '-c', 'user.name=lgtm', '-c', 'user.email=lgtm@example.com') + args, cwd=path,
+                          stdout=open(os.devnull, 'w'))
+
+
+def commit(path, files, message):
+    for file_path, contents in files.items():
+        if os.path.dirname(file_path) and not os.path.isdir(os.path.join(path, os.path.dirname(file_path))):
+            os.makedirs(os.path.join(path, os.path.dirname(file_path)))
+        with open(os.path.join(path, file_path), 'w') as f:
+            f.write(contents)
+    git(path, 'add', '.')
+    git(path, 'commit', '-q', '-m', message)
+
+
+class LocalCheckoutTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(LocalCheckoutTests, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        git(self.path, 'init', '-q')
+        git(self.path, 'checkout', '-q', '-b', 'master')
+        commit(self.path, {'OWNERS': '@foo\n@bar *.js\n', 'build/OWNERS': '@baz\n', 'README': ''}, 'base')
+        git(self.path, 'checkout', '-q', '-b', 'feature')
+        # a pull request can't add its author to the OWNERS file
+        commit(self.path, {'build/app.js': '', 'OWNERS': '@bat\n'}, 'change')
+        git(self.path, 'checkout', '-q', 'master')
+        commit(self.path, {'master-only.txt': ''}, 'later change on master')
+        git(self.path, 'checkout', '-q', 'feature')
+
+    def test_changed_files(self):
+        checkout = local.LocalCheckout(self.path, 'master')
+        self.assertEquals(sorted(checkout.changed_files()), ['OWNERS', 'build/app.js'])
+
+    def test_owners_from_base_branch(self):
+        checkout = local.LocalCheckout(self.path, 'master')
+        self.assertEquals(checkout.read_file_lines('OWNERS'), ['@foo', '@bar *.js', ''])
+        self.assertEquals(checkout.read_file_lines('missing'), [])
+        matcher = checkout.get_owners_matcher('OWNERS')
+        self.assertEquals(matcher.get_owners_of_files(['build/app.js']), (['foo', 'bar'], ['bar']))
+        tree = checkout.get_owners_tree('OWNERS')
+        self.assertEquals(tree.get_owners_of_files(['build/app.js']), (['foo', 'bar', 'baz'], ['bar']))
+
+    def test_remote_tracking_branch(self):
+        git(self.path, 'update-ref', 'refs/remotes/origin/develop', 'master')
+        self.assertEquals(local.LocalCheckout(self.path, 'develop').base, local.LocalCheckout(self.path, 'master').base)
+
+    def test_unknown_ref(self):
+        self.assertRaises(local.LocalCheckoutError, local.LocalCheckout, self.path, 'missing')
+
+    def _head_sha(self, ref='feature'):
+        return local.LocalCheckout(self.path, 'master', head_ref=ref).head
+
+    def test_pull_request_ready_to_merge(self):
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@someone-else'})
+        mock_github.create_fake_pull_request(id=1, file_paths=['unrelated.txt'], head_sha=self._head_sha())
+        options = {'local_repo': self.path}
+        self.assertFalse(pull_request_ready_to_merge('foo', 'OrgName', 'repo-name', 1, options=options))
+        api_calls = mock_github.get_api_calls()
+        self.assertNotIn('get_file_contents', api_calls)
+        self.assertNotIn('get_files', api_calls)
+
+    def test_head_not_checked_out(self):
+        head_sha = self._head_sha()
+        git(self.path, 'checkout', '-q', 'master')
+        mock_github.create_fake_pull_request(id=1, author='bat', head_sha=head_sha, comments=[
+            ('2016-01-01 00:00:02', 'foo', 'lgtm')])
+        options = {'local_repo': self.path}
+        # bar owns build/app.js, which only the pull request's head commit changes
+        self.assertFalse(pull_request_ready_to_merge('foo', 'OrgName', 'repo-name', 1, options=options))
+        self.assertNotIn('get_files', mock_github.get_api_calls())
+
+    def test_head_missing_falls_back_to_github(self):
+        mock_github.create_fake_pull_request(id=1, head_sha='0' * 40)
+        pull_request_ready_to_merge('foo', 'OrgName', 'repo-name', 1, options={'local_repo': self.path})
+        self.assertIn('get_files', mock_github.get_api_calls())
+
+    def test_falls_back_to_github(self):
+        mock_github.create_fake_pull_request(id=1, head_sha=self._head_sha())
+        options = {'local_repo': self.path, 'base_ref': 'missing'}
+        pull_request_ready_to_merge('foo', 'OrgName', 'repo-name', 1, options=options)
+        self.assertIn('get_files', mock_github.get_api_calls())
+
+    def test_no_merge_base_falls_back_to_github(self):
+        git(self.path, 'checkout', '-q', '--orphan', 'unrelated')
+        commit(self.path, {'OWNERS': '@foo\n'}, 'unrelated history')
+        git(self.path, 'checkout', '-q', 'feature')
+        mock_github.create_fake_pull_request(id=1, head_sha=self._head_sha())
+        options = {'local_repo': self.path, 'base_ref': 'unrelated'}
+        pull_request_ready_to_merge('foo', 'OrgName', 'repo-name', 1, options=options)
+        self.assertIn('get_files', mock_github.get_api_calls())
@@ -1,6 +1,9 @@
+import cPickle as pickle
+import fnmatch
 import unittest
 
 from lgtm import owners
+from lgtm import utils
 
 
 class GetOwnersTests(unittest.TestCase):
@@ -58,3 +61,133 @@ class OwnersParseTests(unittest.TestCase):
             ('github-user2', '*.js'),
             ('github-user3', '*/subdir/*'),
         ])
+
+    def test_rules(self):
+        rules = owners.parse(['@github-user *.js', '@github-user *.py'])
+        self.assertEquals(rules[0], owners.Rule('github-user', '*.js'))
+        self.assertEquals(rules[0].glob, '*.js')
+        self.assertIs(rules[0].owner, rules[1].owner)
+
+
+class OwnersMatcherTests(unittest.TestCase):
+
+    def _fnmatch_owners_of_files(self, owner_glob_tuple_list, files):
+        reviewers, required = list(), list()
+        for owner, glob in owner_glob_tuple_list:
+            if not glob:
+                reviewers.append(owner)
+            elif fnmatch.filter(files, glob):
+                reviewers.append(owner)
+                required.append(owner)
+        return utils.ordered_set(reviewers), utils.ordered_set(required)
+
+    def test_matches_fnmatch(self):
+        owner_glob_tuple_list = [
+            ('any', None),
+            ('js', '*.js'),
+            ('build', 'build/*'),
+            ('subdir', '*/subdir/*'),
+            ('partial', '*/sub*dir/*'),
+            ('deep', '*/a/b/*.txt'),
+            ('exact', 'setup.py'),
+            ('question', 'src/?.py'),
+            ('brackets', 'docs/[ab]*.md'),
+            ('unclosed', 'weird[name'),
+            ('everything', '*'),
+            ('js', 'lib/*.js'),
+            ('nothing', 'nope/*'),
+        ]
+        files = [
+            'file1',
+            'app/main.js',
+            'build/foo.txt',
+            'src/mysubdir/bar.py',
+            'src/subdir/bar.py',
+            'x/a/b/c.txt',
+            'setup.py',
+            'src/a.py',
+            'docs/beta.md',
+            'weird[name',
+        ]
+        matcher = owners.compile_matcher(owner_glob_tuple_list)
+        for i in range(len(files) + 1):
+            self.assertEquals(
+                matcher.get_owners_of_files(files[:i]),
+                self._fnmatch_owners_of_files(owner_glob_tuple_list, files[:i]))
+
+    def test_bracket_globs_match_fnmatch(self):
+        for glob in ('*[a/b/c]*', '*/[!x/y/]*', '*[]/q/]*', '*[x/y/z*'):
+            owner_glob_tuple_list = [('bracket', glob)]
+            matcher = owners.compile_matcher(owner_glob_tuple_list)
+            for files in (['x/a'], ['q/x/y/z'], ['a/b/c'], ['x/y/z'], ['other']):
+                self.assertEquals(matcher.get_owners_of_files(files),
+                                  self._fnmatch_owners_of_files(owner_glob_tuple_list, files), (glob, files))
+
+    def test_order(self):
+        matcher = owners.compile_matcher([
+            ('foo', None),
+            ('bar', 'b*'),
+            ('bat', '*t'),
+            ('foo', '*'),
+        ])
+        reviewers, required = matcher.get_owners_of_files(['bar', 'bat'])
+        self.assertEquals(reviewers, ['foo', 'bar', 'bat'])
+        self.assertEquals(required, ['bar', 'bat', 'foo'])
+
+    def test_stops_reading_files_once_decided(self):
+        read = []
+
+        def files():
+            for filename in ['a.js', 'b.py', 'c.js', 'd.txt']:
+                read.append(filename)
+                yield filename
+        matcher = owners.compile_matcher([('any', None), ('foo', '*.js'), ('bar', '*.py')])
+        self.assertEquals(matcher.get_owners_of_files(files()), (['any', 'foo', 'bar'], ['foo', 'bar']))
+        self.assertEquals(read, ['a.js', 'b.py'])
+        del read[:]
+        owners.compile_matcher([('any', None)]).get_owners_of_files(files())
+        self.assertEquals(read, [])
+
+    def test_pickle(self):
+        matcher = pickle.loads(pickle.dumps(owners.compile_matcher([('foo', '*.js'), ('bar', 'src/*')]), 2))
+        self.assertEquals(matcher.get_owners_of_files(['src/a.js']), (['foo', 'bar'], ['foo', 'bar']))
+
+    def test_reusable(self):
+        matcher = owners.compile_matcher([('foo', '*.js'), ('bar', '*.py')])
+        self.assertEquals(matcher.get_owners_of_files(['a.js']), (['foo'], ['foo']))
+        self.assertEquals(matcher.get_owners_of_files(['a.py']), (['bar'], ['bar']))
+
+
+class ParseDirectivesTests(unittest.TestCase):
+
+    def test_per_file(self):
+        self.assertEquals(owners.parse(['per-file *.js=@foo', 'per-file build/* = bar']),
+                          [('foo', '*.js'), ('bar', 'build/*')])
+
+    def test_noparent(self):
+        self.assertEquals(owners.parse(['set noparent', '@foo']), [('foo', None)])
+        self.assertTrue(owners.compile_owners_file(['set noparent', '@foo']).noparent)
+        self.assertFalse(owners.compile_owners_file(['@foo']).noparent)
+
+
+class OwnersTreeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = owners.OwnersTree({
+            '': owners.compile_owners_file(['@root', '@js *.js']),
+            'src': owners.compile_owners_file(['@src', '@api api/*']),
+            'src/vendor': owners.compile_owners_file(['set noparent', '@vendor']),
+        })
+
+    def test_root_only(self):
+        self.assertEquals(self.tree.get_owners_of_files(['setup.py']), (['root'], []))
+
+    def test_nested(self):
+        self.assertEquals(self.tree.get_owners_of_files(['src/api/users.js']),
+                          (['root', 'js', 'src', 'api'], ['js', 'api']))
+
+    def test_globs_are_relative(self):
+        self.assertEquals(self.tree.get_owners_of_files(['api/users.py']), (['root'], []))
+
+    def test_noparent(self):
+        self.assertEquals(self.tree.get_owners_of_files(['src/vendor/lib.js']), (['vendor'], []))
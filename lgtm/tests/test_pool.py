@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+
+from lgtm import pool
+
+
+class ImapUnorderedTests(unittest.TestCase):
+
+    def test_results(self):
+        results = pool.imap_unordered(lambda x: x * 2, range(10), max_workers=3)
+        self.assertEquals(sorted(r.value for r in results), [x * 2 for x in range(10)])
+
+    def test_streams_in_completion_order(self):
+        results = pool.imap_unordered(lambda x: time.sleep(x) or x, [0.2, 0.01], max_workers=2)
+        self.assertEquals([r.item for r in results], [0.01, 0.2])
+
+    def test_bounded(self):
+        state = {'running': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def work(x):
+            with lock:
+                state['running'] += 1
+                state['max'] = max(state['max'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+
+        list(pool.imap_unordered(work, range(20), max_workers=4))
+        self.assertLessEqual(state['max'], 4)
+
+    def test_errors(self):
+        def work(x):
+            if x == 2:
+                raise ValueError(x)
+            return x
+
+        results = dict((r.item, r) for r in pool.imap_unordered(work, range(4)))
+        self.assertEquals(results[1].value, 1)
+        self.assertTrue(isinstance(results[2].exc_info[1], ValueError))
+
+    def test_lazy_input(self):
+        consumed = []
+
+        def items():
+            for x in range(5):
+                consumed.append(x)
+                yield x
+
+        results = pool.imap_unordered(lambda x: x, items(), max_workers=2)
+        next(results)
+        self.assertLessEqual(len(consumed), 3)
+
+
+class ImapTests(unittest.TestCase):
+
+    def test_in_item_order(self):
+        results = pool.imap(lambda x: time.sleep(x) or x, [0.2, 0.01, 0.1, 0], max_workers=4)
+        self.assertEquals([r.value for r in results], [0.2, 0.01, 0.1, 0])
+
+    def test_errors(self):
+        def work(x):
+            if x == 2:
+                raise ValueError(x)
+            return x
+
+        results = list(pool.imap(work, range(4), max_workers=2))
+        self.assertEquals([r.item for r in results], [0, 1, 2, 3])
+        self.assertTrue(isinstance(results[2].exc_info[1], ValueError))
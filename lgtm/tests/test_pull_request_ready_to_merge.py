@@ -1,4 +1,7 @@
 import mock
+import shutil
+import tempfile
+import threading
 
 from functools import partial
 
@@ -6,6 +9,8 @@ from github import UnknownObjectException
 
 import mock_github
 from base import MockPyGithubTests
+import lgtm
+from lgtm import evaluate_many
 from lgtm import pull_request_ready_to_merge as pull_request_ready_to_merge_
 
 
@@ -19,6 +24,17 @@ class PullRequestReadyToMergeTests(MockPyGithubTests):
         # baz still needs to sign off
         self.assertFalse(pull_request_ready_to_merge(pr_number=1))
 
+    def test_comments_fetched_once(self):
+        mock_github.create_fake_pull_request(id=1)
+        pull_request_ready_to_merge(pr_number=1)
+        self.assertEquals(mock_github.get_api_calls().count('get_issue_comments'), 1)
+
+    def test_hierarchical_owners(self):
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@bar *.js', 'build/OWNERS': 'set noparent\n@foo'})
+        mock_github.create_fake_pull_request(id=1, file_paths=['build/foo.js'])
+        self.assertTrue(pull_request_ready_to_merge(pr_number=1, options={'hierarchical_owners': True}))
+        self.assertFalse(pull_request_ready_to_merge(pr_number=1))
+
     def test_404(self):
         mock_github.create_fake_pull_request(id=1)
         with self.assertRaises(UnknownObjectException):
@@ -86,3 +102,77 @@ class PullRequestReadyToMergeTests(MockPyGithubTests):
         mock_github.create_fake_pull_request(author='blah', comments=[])
         pull_request_ready_to_merge(pr_number=1, options={'skip_assignment': True})
         self.assertFalse(assigned_to_someone.called)
+
+
+class EvaluateManyTests(MockPyGithubTests):
+
+    def test_evaluate_many(self):
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@bar'})
+        mock_github.create_fake_pull_request(id=1, author='bar', comments=[])
+        mock_github.add_fake_pull_request(id=2, author='blah', comments=[])
+        results = list(evaluate_many('foo', [
+            ('OrgName', 'repo-name', 1),
+            ('OrgName', 'repo-name', 2),
+            ('OrgName', 'repo-name', 3),
+        ]))
+        results = dict((r.pr_number, r) for r in results)
+        self.assertTrue(results[1].ready)
+        self.assertFalse(results[2].ready)
+        self.assertTrue(isinstance(results[3].error, UnknownObjectException))
+        self.assertEquals(mock_github.get_api_calls().count('get_organization'), 1)
+
+    def test_repositories_set_up_concurrently(self):
+        mock_github.create_fake_pull_request(id=1)
+        other_repo_started = threading.Event()
+        waited = []
+
+        def get_owners_matcher(github_repo, owners_file, options):
+            if github_repo.repo_name == 'slow-repo':
+                waited.append(other_repo_started.wait(5))
+            else:
+                other_repo_started.set()
+            return get_owners_matcher_(github_repo, owners_file, options)
+
+        get_owners_matcher_ = lgtm._get_owners_matcher
+        with mock.patch('lgtm._get_owners_matcher', side_effect=get_owners_matcher):
+            results = list(evaluate_many('foo', [('OrgName', 'slow-repo', 1), ('OrgName', 'repo-name', 1)],
+                                         max_workers=2))
+        self.assertEquals([r.error for r in results], [None, None])
+        self.assertEquals(waited, [True])
+
+
+class MemoizeResultsTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(MemoizeResultsTests, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.options = {'cache_dir': self.cache_dir, 'memoize_results': True}
+        mock_github.create_fake_pull_request(id=1)
+
+    def test_unchanged(self):
+        self.assertFalse(pull_request_ready_to_merge(pr_number=1, options=self.options))
+        self.assertIn('edit_issue', mock_github.get_api_calls())
+        mock_github.reset_api_calls()
+        self.assertFalse(pull_request_ready_to_merge(pr_number=1, options=self.options))
+        api_calls = mock_github.get_api_calls()
+        for skipped in ('edit_issue', 'create_issue_comment', 'get_commits', 'get_user'):
+            self.assertNotIn(skipped, api_calls)
+
+    def test_new_sign_off(self):
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@qux'})
+        self.assertFalse(pull_request_ready_to_merge(pr_number=1, options=self.options))
+        mock_github.create_fake_pull_request(id=1, comments=[('2016-01-01 00:00:06', 'qux', 'lgtm')])
+        self.assertTrue(pull_request_ready_to_merge(pr_number=1, options=self.options))
+
+    def test_team_changed(self):
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@OrgName/team1'})
+        mock_github.create_fake_pull_request(id=1, comments=[('2016-01-01 00:00:06', 'baz', 'lgtm')])
+        self.assertTrue(pull_request_ready_to_merge(pr_number=1, options=self.options))
+        mock_github.create_fake_org(teams=[mock_github.MockTeam('team1', ['someone-else'])])
+        self.assertFalse(pull_request_ready_to_merge(pr_number=1, options=self.options))
+
+    def test_owners_changed(self):
+        self.assertFalse(pull_request_ready_to_merge(pr_number=1, options=self.options))
+        mock_github.create_fake_repo(file_contents={'OWNERS': '@foo'})
+        self.assertTrue(pull_request_ready_to_merge(pr_number=1, options=self.options))
@@ -0,0 +1,90 @@
+import unittest
+
+from lgtm import ratelimit
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RequestSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _scheduler(self, **kwargs):
+        return ratelimit.RequestScheduler(clock=self.clock.time, sleep=self.clock.sleep,
+                                          random_uniform=lambda a, b: b, **kwargs)
+
+    def test_no_pacing_by_default(self):
+        scheduler = self._scheduler()
+        for _ in range(100):
+            scheduler.before_request()
+        self.assertEquals(self.clock.sleeps, [])
+
+    def test_max_requests_per_second(self):
+        scheduler = self._scheduler(max_requests_per_second=2)
+        for _ in range(6):
+            scheduler.before_request()
+        self.assertEquals(self.clock.sleeps, [0.5, 0.5, 0.5, 0.5])
+        self.assertEquals(scheduler.total_wait, 2.0)
+
+    def test_quota_exhausted(self):
+        scheduler = self._scheduler()
+        scheduler.update({'x-ratelimit-limit': '5000', 'x-ratelimit-remaining': '0',
+                          'x-ratelimit-reset': '1030'})
+        scheduler.before_request()
+        self.assertEquals(self.clock.sleeps, [31.0])
+        # the quota has been reset
+        scheduler.before_request()
+        self.assertEquals(len(self.clock.sleeps), 1)
+
+    def test_max_wait(self):
+        scheduler = self._scheduler(max_wait=600)
+        scheduler.update({'x-ratelimit-limit': '5000', 'x-ratelimit-remaining': '0',
+                          'x-ratelimit-reset': '4600'})
+        self.assertRaises(ratelimit.RateLimitWaitError, scheduler.before_request)
+        self.assertEquals(self.clock.sleeps, [])
+        scheduler.max_wait = None
+        scheduler.before_request()
+        self.assertEquals(self.clock.sleeps, [3601.0])
+
+    def test_low_quota_spreads_requests(self):
+        scheduler = self._scheduler()
+        scheduler.update({'x-ratelimit-limit': '5000', 'x-ratelimit-remaining': '10',
+                          'x-ratelimit-reset': '1100'})
+        for _ in range(3):
+            scheduler.before_request()
+        self.assertEquals(len(self.clock.sleeps), 2)
+        self.assertTrue(all(seconds > 5 for seconds in self.clock.sleeps))
+
+    def test_retry_after(self):
+        scheduler = self._scheduler()
+        self.assertEquals(scheduler.retry_delay(429, {'retry-after': '3'}, '', 0), 4.0)
+
+    def test_retry_at_reset(self):
+        scheduler = self._scheduler()
+        headers = {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '1010'}
+        self.assertEquals(scheduler.retry_delay(403, headers, '', 0), 11.0)
+
+    def test_secondary_rate_limit_backoff(self):
+        scheduler = self._scheduler(base_delay=1.0, max_delay=5.0)
+        body = '{"message": "You have exceeded a secondary rate limit."}'
+        self.assertEquals([scheduler.retry_delay(403, {}, body, attempt) for attempt in range(5)],
+                          [1.0, 2.0, 4.0, 5.0, 5.0])
+        self.assertEquals(scheduler.retry_delay(403, {}, body, 5), None)
+
+    def test_forbidden_is_not_retried(self):
+        scheduler = self._scheduler()
+        self.assertEquals(scheduler.retry_delay(403, {}, '{"message": "Must have admin rights"}', 0), None)
+        self.assertEquals(scheduler.retry_delay(500, {}, '', 0), None)
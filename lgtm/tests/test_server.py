@@ -0,0 +1,107 @@
+import hashlib
+import hmac
+import httplib
+import json
+
+import mock_github
+from base import MockPyGithubTests
+from lgtm import server
+
+
+PULL_REQUEST_EVENT = {
+    'action': 'synchronize',
+    'number': 1,
+    'pull_request': {'number': 1, 'head': {'sha': 'sha1'}},
+    'repository': {'name': 'repo-name', 'owner': {'login': 'OrgName'}},
+}
+
+ISSUE_COMMENT_EVENT = {
+    'action': 'created',
+    'issue': {'number': 1, 'pull_request': {'url': 'https://api.github.com/repos/OrgName/repo-name/pulls/1'}},
+    'comment': {'body': 'lgtm', 'user': {'login': 'baz'}},
+    'repository': {'name': 'repo-name', 'owner': {'login': 'OrgName'}},
+}
+
+PULL_REQUEST_REVIEW_EVENT = {
+    'action': 'submitted',
+    'review': {'state': 'approved', 'user': {'login': 'baz'}},
+    'pull_request': {'number': 1, 'head': {'sha': 'sha1'}},
+    'repository': {'name': 'repo-name', 'owner': {'login': 'OrgName'}},
+}
+
+
+class ParseEventTests(MockPyGithubTests):
+
+    def test_pull_request(self):
+        self.assertEquals(server.parse_event('pull_request', PULL_REQUEST_EVENT), ('OrgName', 'repo-name', 1))
+
+    def test_issue_comment(self):
+        self.assertEquals(server.parse_event('issue_comment', ISSUE_COMMENT_EVENT), ('OrgName', 'repo-name', 1))
+
+    def test_pull_request_review(self):
+        self.assertEquals(
+            server.parse_event('pull_request_review', PULL_REQUEST_REVIEW_EVENT), ('OrgName', 'repo-name', 1))
+
+    def test_issue_comment_not_on_pull_request(self):
+        payload = dict(ISSUE_COMMENT_EVENT, issue={'number': 1})
+        self.assertEquals(server.parse_event('issue_comment', payload), None)
+
+    def test_ignored_action(self):
+        payload = dict(PULL_REQUEST_EVENT, action='closed')
+        self.assertEquals(server.parse_event('pull_request', payload), None)
+
+
+class WebhookServerTests(MockPyGithubTests):
+
+    def setUp(self):
+        super(WebhookServerTests, self).setUp()
+        mock_github.create_fake_pull_request(id=1)
+        self.server = server.WebhookServer(('127.0.0.1', 0), github_token='foo', secret='s3cret')
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        server.threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.01}).start()
+
+    def _post(self, event, payload, secret='s3cret'):
+        body = json.dumps(payload)
+        signature = 'sha256=' + hmac.new(secret, body, hashlib.sha256).hexdigest()
+        connection = httplib.HTTPConnection(*self.server.server_address)
+        connection.request('POST', '/', body, {'X-GitHub-Event': event, 'X-Hub-Signature-256': signature})
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        return response.status
+
+    def test_publishes_status(self):
+        self.assertEquals(self._post('pull_request', PULL_REQUEST_EVENT), 202)
+        self.server.wait()
+        # baz still needs to sign off
+        self.assertEquals(mock_github.get_statuses(), [dict(
+            sha='sha1', state='pending', description='Waiting for reviewers to sign off', context='lgtm')])
+
+    def test_ready(self):
+        mock_github.create_fake_repo(file_contents={'OWNERS': ''})
+        self.assertEquals(self._post('issue_comment', ISSUE_COMMENT_EVENT), 202)
+        self.server.wait()
+        self.assertEquals([s['state'] for s in mock_github.get_statuses()], ['success'])
+
+    def test_reuses_connection(self):
+        self._post('pull_request', PULL_REQUEST_EVENT)
+        self.server.wait()
+        self._post('pull_request_review', PULL_REQUEST_REVIEW_EVENT)
+        self.server.wait()
+        self.assertEquals(len(mock_github.get_statuses()), 2)
+        self.assertEquals(mock_github.get_api_calls().count('get_organization'), 1)
+        self.assertEquals(mock_github.get_api_calls().count('get_members'), 1)
+
+    def test_bad_signature(self):
+        self.assertEquals(self._post('pull_request', PULL_REQUEST_EVENT, secret='wrong'), 401)
+        self.server.wait()
+        self.assertEquals(mock_github.get_statuses(), [])
+
+    def test_ping(self):
+        self.assertEquals(self._post('ping', {'zen': 'Keep it logically awesome.'}), 200)
+
+    def test_not_found(self):
+        self._post('pull_request', dict(PULL_REQUEST_EVENT, pull_request={'number': 2}))
+        self.server.wait()
+        self.assertEquals(mock_github.get_statuses(), [])
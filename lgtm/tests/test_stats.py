@@ -0,0 +1,46 @@
+import mock
+import unittest
+
+from lgtm import stats
+
+
+class StatsTests(unittest.TestCase):
+
+    def setUp(self):
+        stats.collector.reset()
+        self.addCleanup(stats.collector.reset)
+
+    def test_timed(self):
+        @stats.timed('double')
+        def double(x):
+            return x * 2
+        self.assertEquals(double(2), 4)
+        self.assertEquals(double(3), 6)
+        self.assertEquals(stats.collector.as_dict()['phases']['double']['calls'], 2)
+
+    def test_timed_raises(self):
+        @stats.timed('fail')
+        def fail():
+            raise ValueError()
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEquals(stats.collector.as_dict()['phases']['fail']['calls'], 1)
+
+    def test_record_request(self):
+        stats.collector.record_request('/repos/o/r/pulls/1/files', 200, 0.5, 0, 100)
+        stats.collector.record_request('/repos/o/r/pulls/1/files?page=3', 200, 0.5, 10, 50)
+        http = stats.collector.as_dict()['http']
+        self.assertEquals(http['requests'], 2)
+        self.assertEquals(http['seconds'], 1.0)
+        self.assertEquals((http['bytes_sent'], http['bytes_received']), (10, 150))
+        self.assertEquals((http['paginated_requests'], http['max_page']), (1, 3))
+        self.assertEquals(http['statuses'], {'200': 2})
+        self.assertEquals(len(stats.collector.summary_lines()), 1)
+
+    def test_spans(self):
+        tracer = mock.MagicMock()
+        with mock.patch.dict(stats._tracer, {'tracer': tracer}):
+            with stats.phase('outer'):
+                pass
+        tracer.start_as_current_span.assert_called_once_with('outer')
+        self.assertTrue(tracer.start_as_current_span.return_value.__exit__.called)
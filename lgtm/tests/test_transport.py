@@ -0,0 +1,168 @@
+import json
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+import zlib
+
+import mock
+from github import Github
+from github import GithubException
+
+from lgtm import cache
+from lgtm import ratelimit
+from lgtm import stats
+from lgtm import transport
+from mock_api_server import MockAPIServer
+
+
+class TransportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockAPIServer()
+        self.addCleanup(self.server.stop)
+        self.server.add_route('GET', '/users/foo', self._get_user)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        transport.install()
+        transport.set_response_cache(cache.ResponseCache(self.cache_dir))
+        self.addCleanup(transport.uninstall)
+        stats.collector.reset()
+        self.addCleanup(stats.collector.reset)
+
+    def _get_user(self, request):
+        if request.headers.get('if-none-match') == '"v1"':
+            return 304, {'ETag': '"v1"', 'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '4999'}, ''
+        return 200, {'ETag': '"v1"', 'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '4999'}, {
+            'login': 'foo', 'name': 'Foo'}
+
+    def test_conditional_request(self):
+        client = Github('token', base_url=self.server.url)
+        self.assertEquals(client.get_user('foo').name, 'Foo')
+        self.assertEquals(client.get_user('foo').name, 'Foo')
+        self.assertEquals([r.headers.get('if-none-match') for r in self.server.requests], [None, '"v1"'])
+        self.assertEquals(client.rate_limiting[0], 4999)
+
+    def test_cache_shared_across_clients(self):
+        Github('token', base_url=self.server.url).get_user('foo')
+        self.assertEquals(Github('token', base_url=self.server.url).get_user('foo').name, 'Foo')
+        self.assertEquals(self.server.requests[-1].headers.get('if-none-match'), '"v1"')
+
+    def test_request_count(self):
+        client = Github('token', base_url=self.server.url)
+        client.get_user('foo')
+        client.get_user('foo')
+        http = stats.collector.as_dict()['http']
+        self.assertEquals(http['requests'], 2)
+        self.assertEquals(http['statuses'], {'200': 1, '304': 1})
+
+    def test_stats(self):
+        Github('token', base_url=self.server.url).get_user('foo')
+        http = stats.collector.as_dict()['http']
+        self.assertEquals(http['requests'], 1)
+        self.assertTrue(http['bytes_received'] > 0)
+
+    def test_no_cache(self):
+        transport.set_response_cache(None)
+        client = Github('token', base_url=self.server.url)
+        client.get_user('foo')
+        client.get_user('foo')
+        self.assertEquals([r.headers.get('if-none-match') for r in self.server.requests], [None, None])
+
+
+class ConnectionPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockAPIServer()
+        self.addCleanup(self.server.stop)
+        self.server.add_route('GET', '/users/foo', lambda request: (200, {}, {'login': 'foo', 'name': 'Foo'}))
+        transport.install()
+        self.addCleanup(transport.uninstall)
+        stats.collector.reset()
+        self.addCleanup(stats.collector.reset)
+
+    def _connections(self):
+        http = stats.collector.as_dict()['http']
+        return http['connections_opened'], http['connections_reused']
+
+    def test_keep_alive(self):
+        Github('token', base_url=self.server.url).get_user('foo')
+        self.assertEquals(Github('token', base_url=self.server.url).get_user('foo').name, 'Foo')
+        self.assertEquals(self._connections(), (1, 1))
+
+    def test_no_pool(self):
+        connection_pool = transport.get_connection_pool()
+        self.addCleanup(transport.set_connection_pool, connection_pool)
+        transport.set_connection_pool(None)
+        client = Github('token', base_url=self.server.url)
+        client.get_user('foo')
+        client.get_user('foo')
+        self.assertEquals(self._connections(), (2, 0))
+
+    def test_stale_connection(self):
+        Github('token', base_url=self.server.url).get_user('foo')
+        for connections in transport.get_connection_pool()._idle.values():
+            for connection in connections:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+        self.assertEquals(Github('token', base_url=self.server.url).get_user('foo').name, 'Foo')
+        self.assertEquals(self._connections(), (2, 0))
+
+    def test_post_on_stale_connection(self):
+        self.server.add_route('POST', '/comments', lambda request: (201, {}, {}))
+        Github('token', base_url=self.server.url).get_user('foo')
+        for connections in transport.get_connection_pool()._idle.values():
+            for connection in connections:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+        connection = transport.HTTPConnection(self.server.host, self.server.port)
+        connection.request('POST', '/comments', '{}', {})
+        self.assertEquals(connection.getresponse().status, 201)
+        self.assertEquals([request.method for request in self.server.requests], ['GET', 'POST'])
+
+    def test_post_timeout_is_not_sent_again(self):
+        connection_pool = transport.get_connection_pool()
+        self.addCleanup(setattr, connection_pool, 'timeout', connection_pool.timeout)
+        transport.configure_connections(timeout=0.2)
+        self.server.add_route('POST', '/comments', lambda request: time.sleep(0.5) or (201, {}, {}))
+        Github('token', base_url=self.server.url).get_user('foo')
+        connection = transport.HTTPConnection(self.server.host, self.server.port)
+        connection.request('POST', '/comments', '{}', {})
+        self.assertRaises(socket.timeout, connection.getresponse)
+        self.assertEquals([request.method for request in self.server.requests], ['GET', 'POST'])
+
+    def test_gzip(self):
+        body = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        body = body.compress(json.dumps({'login': 'bar', 'name': 'Bar'})) + body.flush()
+        self.server.add_route('GET', '/users/bar', lambda request: (200, {'Content-Encoding': 'gzip'}, body))
+        transport.set_gzip(True)
+        self.assertEquals(Github('token', base_url=self.server.url).get_user('bar').name, 'Bar')
+        self.assertEquals(self.server.requests[-1].headers.get('accept-encoding'), 'gzip')
+
+
+class RateLimitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockAPIServer()
+        self.addCleanup(self.server.stop)
+        transport.install()
+        self.addCleanup(transport.uninstall)
+        self.sleep = mock.Mock()
+        scheduler = transport.get_scheduler()
+        self.addCleanup(transport.set_scheduler, scheduler)
+        transport.set_scheduler(ratelimit.RequestScheduler(sleep=self.sleep))
+
+    def test_retry_after(self):
+        responses = [(429, {'Retry-After': '2'}, {'message': 'slow down'}),
+                     (200, {}, {'login': 'foo', 'name': 'Foo'})]
+        self.server.add_route('GET', '/users/foo', lambda request: responses.pop(0))
+        self.assertEquals(Github('token', base_url=self.server.url).get_user('foo').name, 'Foo')
+        self.assertEquals(len(self.server.requests), 2)
+        self.assertEquals(self.sleep.call_count, 1)
+        self.assertTrue(2 <= self.sleep.call_args[0][0] <= 3)
+
+    def test_forbidden_is_not_retried(self):
+        self.server.add_route('GET', '/users/foo', lambda request: (403, {}, {'message': 'Forbidden'}))
+        with self.assertRaises(GithubException):
+            Github('token', base_url=self.server.url).get_user('foo')
+        self.assertEquals(len(self.server.requests), 1)
+        self.assertFalse(self.sleep.called)
@@ -0,0 +1,367 @@
+"""
+HTTP transport for PyGithub. The connection classes here are installed into PyGithub's Requester,
+so every GitHub API request made in this process goes through them.
+
+Every request is recorded in stats.collector and paced by a ratelimit.RequestScheduler, which also
+retries requests that GitHub rejected because of a rate limit. With a ResponseCache, GET requests
+are sent with If-None-Match/If-Modified-Since and a 304 Not Modified answer, which does not count
+against the GitHub rate limit, is served from the cache.
+
+PyGithub opens a new connection for every request. Here, requests are sent on keep-alive
+connections from a ConnectionPool shared by every client in the process, so a batch of small
+requests pays for one TLS handshake instead of one each. Responses can also be requested gzipped.
+"""
+import errno
+import httplib
+import socket
+import threading
+import time
+import zlib
+
+from github.Requester import Requester
+
+import ratelimit
+import stats
+
+
+# idle keep-alive connections kept per host
+DEFAULT_POOL_SIZE = 8
+
+# times an idempotent request is sent again after a connection error
+DEFAULT_CONNECTION_RETRIES = 2
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+# socket errors of a keep-alive connection that the server closed while it sat idle
+STALE_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.EPIPE)
+
+
+class ConnectionPool(object):
+    """
+    Idle keep-alive connections by scheme, host and port, shared by every thread. A connection is
+    taken out of the pool for one request, and put back once its response has been read.
+    """
+
+    def __init__(self, max_idle=DEFAULT_POOL_SIZE, timeout=None, retries=DEFAULT_CONNECTION_RETRIES):
+        """
+        :param max_idle: idle connections kept per host, more are closed
+        :param timeout: socket timeout in seconds, or None for the one the client asked for
+        :param retries: times an idempotent request is sent again after a connection error
+        """
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, key, create):
+        """
+        :param key: a (scheme, host, port, proxy tunnel host) tuple
+        :param create: a callable that opens a new connection
+        :return: (connection, whether it was used before)
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return create(), False
+
+    def release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def clear(self):
+        """
+        Close every idle connection
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+_state = {
+    'response_cache': None,
+    'scheduler': ratelimit.RequestScheduler(),
+    'connection_pool': ConnectionPool(),
+    'gzip': False,
+}
+
+
+def install():
+    """
+    Route PyGithub requests through this module. Only affects PyGithub clients created afterwards.
+    """
+    Requester.injectConnectionClasses(HTTPConnection, HTTPSConnection)
+
+
+def uninstall():
+    _state['response_cache'] = None
+    _state['gzip'] = False
+    if _state['connection_pool']:
+        _state['connection_pool'].clear()
+    Requester.resetConnectionClasses()
+
+
+def set_response_cache(response_cache):
+    """
+    :param response_cache: a cache.ResponseCache for conditional requests, or None to disable
+    """
+    _state['response_cache'] = response_cache
+
+
+def get_scheduler():
+    return _state['scheduler']
+
+
+def set_scheduler(scheduler):
+    """
+    :param scheduler: a ratelimit.RequestScheduler, or None to send requests without pacing or retries
+    """
+    _state['scheduler'] = scheduler
+
+
+def get_connection_pool():
+    return _state['connection_pool']
+
+
+def set_connection_pool(connection_pool):
+    """
+    :param connection_pool: a ConnectionPool, or None to open a new connection for every request
+    """
+    if _state['connection_pool']:
+        _state['connection_pool'].clear()
+    _state['connection_pool'] = connection_pool
+
+
+def configure_connections(pool_size=None, timeout=None, retries=None):
+    """
+    Change the settings of the shared ConnectionPool, see ConnectionPool(). Settings that are None
+    are left as they are.
+    """
+    connection_pool = _state['connection_pool']
+    if connection_pool is None:
+        return
+    if pool_size is not None:
+        connection_pool.max_idle = pool_size
+    if timeout is not None:
+        connection_pool.timeout = timeout
+    if retries is not None:
+        connection_pool.retries = retries
+
+
+def set_gzip(enabled):
+    """
+    :param enabled: whether to ask for gzipped responses, which are decompressed before PyGithub
+        or the response cache see them
+    """
+    _state['gzip'] = enabled
+
+
+def get_connection_class(scheme):
+    return HTTPSConnection if scheme == 'https' else HTTPConnection
+
+
+class CachedHTTPResponse(object):
+    """
+    Stands in for an httplib.HTTPResponse, with the parts PyGithub reads
+    """
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self._headers = headers
+        self._body = body
+
+    def getheaders(self):
+        return self._headers.items()
+
+    def getheader(self, name, default=None):
+        return self._headers.get(name.lower(), default)
+
+    def read(self, amt=None):
+        body, self._body = self._body, ''
+        return body
+
+    def isclosed(self):
+        return True
+
+
+def _decompress(response, headers):
+    body = zlib.decompress(response.read(), 16 + zlib.MAX_WBITS)
+    headers = dict((k, v) for k, v in headers.items() if k != 'content-encoding')
+    headers['content-length'] = str(len(body))
+    return CachedHTTPResponse(response.status, response.reason, headers, body), headers
+
+
+def _is_stale_connection_error(error):
+    """
+    :return: True if a request failed because the server had closed the connection before it was
+        sent, rather than while it was handling the request
+    """
+    if isinstance(error, httplib.BadStatusLine):
+        return True
+    return isinstance(error, socket.error) and not isinstance(error, socket.timeout) and \
+        error.errno in STALE_CONNECTION_ERRNOS
+
+
+class _ConnectionMixin:
+    # httplib connections are old-style classes, so the base class is called explicitly
+    _base_class = None
+    _scheme = None
+
+    def request(self, method, url, body=None, headers=None):
+        headers = dict(headers or {})
+        if _state['gzip']:
+            headers.setdefault('Accept-Encoding', 'gzip')
+        self._cache_key = None
+        self._cached_response = None
+        response_cache = _state['response_cache']
+        if response_cache is not None and method == 'GET':
+            self._cache_key = response_cache.make_key(self._absolute_url(url), headers)
+            self._cached_response = response_cache.get(self._cache_key)
+            if self._cached_response:
+                if self._cached_response.etag:
+                    headers['If-None-Match'] = self._cached_response.etag
+                if self._cached_response.last_modified:
+                    headers['If-Modified-Since'] = self._cached_response.last_modified
+        self._request_args = (method, url, body, headers)
+        self.close()
+        self._connection = self._response = None
+
+    def _open(self):
+        timeout = self.timeout
+        if _state['connection_pool'] and _state['connection_pool'].timeout:
+            timeout = _state['connection_pool'].timeout
+        connection = self._base_class(self.host, self.port, timeout=timeout)
+        if self._tunnel_host:
+            connection.set_tunnel(self._tunnel_host, self._tunnel_port, self._tunnel_headers)
+        return connection
+
+    def _pool_key(self):
+        return self._scheme, self.host, self.port, self._tunnel_host
+
+    def _send(self):
+        """
+        Send the request and read the response status and headers. A request that fails on a
+        reused connection, which the server may have closed while it sat idle, is sent again on a
+        new one. A request that is not idempotent, like posting a comment, is only sent again when
+        the connection was found closed, not when it timed out after the server may have handled
+        it. An idempotent request that fails on a new connection is retried up to the pool's
+        retries.
+        :return: the httplib.HTTPResponse
+        """
+        self._release()
+        scheduler = _state['scheduler']
+        if scheduler:
+            scheduler.before_request()
+        connection_pool = _state['connection_pool']
+        attempt = 0
+        while True:
+            reused = False
+            if connection_pool:
+                connection, reused = connection_pool.acquire(self._pool_key(), self._open)
+            else:
+                connection = self._open()
+            self._sent_at = time.time()
+            try:
+                connection.request(*self._request_args)
+                response = connection.getresponse()
+            except (httplib.HTTPException, socket.error) as error:
+                connection.close()
+                idempotent = self._request_args[0] in IDEMPOTENT_METHODS
+                if reused:
+                    if not idempotent and not _is_stale_connection_error(error):
+                        raise
+                    continue
+                retries = connection_pool.retries if connection_pool else 0
+                if not idempotent or attempt >= retries:
+                    raise
+                attempt += 1
+                continue
+            stats.collector.record_connection(reused)
+            self._connection, self._response = connection, response
+            return response
+
+    def _release(self):
+        """
+        Put the connection of the last response back in the pool if the response was read to the end
+        and the server keeps the connection open, otherwise close it
+        """
+        connection, response = self._connection, self._response
+        self._connection = self._response = None
+        if connection is None:
+            return
+        connection_pool = _state['connection_pool']
+        if connection_pool and response.isclosed() and not response.will_close:
+            connection_pool.release(self._pool_key(), connection)
+        else:
+            connection.close()
+
+    def close(self):
+        if getattr(self, '_connection', None):
+            self._release()
+
+    def _record(self, response, headers, body=None):
+        method, url, request_body, request_headers = self._request_args
+        received = len(body) if body is not None else int(headers.get('content-length') or 0)
+        stats.collector.record_request(
+            url, response.status, time.time() - self._sent_at, len(request_body or ''), received)
+
+    def _getresponse_with_retries(self):
+        attempt = 0
+        while True:
+            response = self._send()
+            headers = dict((k.lower(), v) for k, v in response.getheaders())
+            self._record(response, headers)
+            if headers.get('content-encoding') == 'gzip':
+                response, headers = _decompress(response, headers)
+            scheduler = _state['scheduler']
+            if not scheduler:
+                return response, headers
+            scheduler.update(headers)
+            if response.status not in ratelimit.RATE_LIMIT_STATUSES:
+                return response, headers
+            body = response.read()
+            delay = scheduler.retry_delay(response.status, headers, body, attempt)
+            if delay is None:
+                return CachedHTTPResponse(response.status, response.reason, headers, body), headers
+            scheduler.wait(delay, 'rate limited with status %d, retry %d' % (response.status, attempt + 1))
+            attempt += 1
+
+    def getresponse(self, *args, **kwargs):
+        response, headers = self._getresponse_with_retries()
+        if self._cache_key is None:
+            return response
+        response_cache = _state['response_cache']
+        if response.status == httplib.NOT_MODIFIED and self._cached_response:
+            response.read()
+            cached = self._cached_response
+            # keep fresh rate limit headers from the 304
+            fresh = dict((k, v) for k, v in headers.items() if k.startswith('x-ratelimit-'))
+            return CachedHTTPResponse(cached.status, 'OK', dict(cached.headers, **fresh), cached.body)
+        if response.status == httplib.OK and ('etag' in headers or 'last-modified' in headers):
+            body = response.read()
+            response_cache.set(self._cache_key, response.status, headers, body)
+            return CachedHTTPResponse(response.status, response.reason, headers, body)
+        return response
+
+    def _absolute_url(self, url):
+        if '://' in url:
+            return url
+        return '%s://%s:%s%s' % (self._scheme, self.host, self.port, url)
+
+
+class HTTPConnection(_ConnectionMixin, httplib.HTTPConnection):
+    _base_class = httplib.HTTPConnection
+    _scheme = 'http'
+
+
+class HTTPSConnection(_ConnectionMixin, httplib.HTTPSConnection):
+    _base_class = httplib.HTTPSConnection
+    _scheme = 'https'
@@ -17,6 +17,20 @@ def ordered_set(item_list):
     return items.values()
 
 
+def intern_login(login):
+    """
+    Share one copy of a GitHub user or team name. The same few names repeat across OWNERS rules,
+    team memberships, comments and reviews of every pull request evaluated in a process.
+    """
+    if isinstance(login, unicode):
+        # PyGithub decodes JSON to unicode, which can't be interned. GitHub logins are ASCII.
+        try:
+            login = login.encode('ascii')
+        except UnicodeEncodeError:
+            return login
+    return intern(login) if isinstance(login, str) else login
+
+
 def make_mention_string(logins):
     return ' '.join(['@%s' % login for login in sorted(logins)])
 
@@ -1,3 +1,6 @@
+import os
+import re
+
 from setuptools import setup, find_packages
 
 install_requires = [
@@ -5,10 +8,17 @@ install_requires = [
     'PyGithub>=1.26.0,<2.0.0',
 ]
 
+
+def get_version():
+    # read the version without importing lgtm, which needs install_requires
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lgtm', '__init__.py')) as f:
+        return re.search(r"^__version__ = '([^']+)'", f.read(), re.M).group(1)
+
+
 setup(
     name='lgtm',
-    version='0.0.14',
-    packages=find_packages(exclude=['tests', 'lgtm/tests']),
+    version=get_version(),
+    packages=find_packages(exclude=['tests', 'lgtm/tests', 'benchmarks']),
     install_requires=install_requires,
     include_package_data=True,
     author='Chase Seibert',